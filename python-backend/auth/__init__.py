@@ -1,3 +1,3 @@
 # auth/__init__.py
 from .auth_service import AuthService
-from .errors import AuthError
+from .errors import AuthError, RateLimitError
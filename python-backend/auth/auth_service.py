@@ -1,38 +1,193 @@
+import asyncio
+import copy
+import inspect
+import os
+import time
 import bcrypt
 import jwt
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from os import getenv
+from threading import BoundedSemaphore, Lock
 from .errors import AuthError
+from .keyring import KeyRing
+from .rbac import PERMISSION_CLAIM
+from .token_cache import TokenCache
 from .utils import validate_email
 
+EXECUTION_MODES = ("inline", "thread", "process")
+DUMMY_PASSWORD = b"dummy-password-for-unknown-users"
+
+
+def hash_password_bytes(password, rounds):
+    """
+    Hash a password with bcrypt at a given cost.
+
+    Module level so process pools can pickle it; AuthService and the bulk
+    importer both hash through it.
+
+    Args:
+        password (bytes): Encoded password.
+        rounds (int): bcrypt cost factor.
+
+    Returns:
+        str: The bcrypt hash.
+    """
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _checkpw(password, hashed):
+    """Check password bytes against a hash; module level for process pools."""
+    return bcrypt.checkpw(password, hashed)
+
+
 class AuthService:
     """Authentication service with reusable components."""
 
-    def __init__(self):
-        """Initialize secret key and algorithm for JWT."""
+    def __init__(self, bcrypt_rounds=None, execution=None, max_workers=None, max_pending=None,
+                 token_cache_size=None, keyring=None, role_manager=None, rate_limiter=None,
+                 user_cache_ttl=0, user_cache_size=10000):
+        """
+        Initialize secret key and algorithm for JWT, and how bcrypt runs.
+
+        Args:
+            bcrypt_rounds (int): bcrypt cost factor (BCRYPT_ROUNDS, default 12).
+                Hashes with another cost are upgraded on the next login.
+            execution (str): "inline" runs bcrypt on the calling thread;
+                "thread" or "process" runs it on a bounded worker pool
+                (AUTH_EXECUTION, default "inline"). The async methods always
+                use the pool ("thread" unless "process" is configured).
+            max_workers (int): Pool size (AUTH_HASH_WORKERS, default CPU count).
+            max_pending (int): Hashes queued or running before new ones are
+                rejected (AUTH_MAX_PENDING_HASHES, default 4 per worker).
+            token_cache_size (int): Verified tokens kept by decode_token
+                (TOKEN_CACHE_SIZE, default 10000); 0 disables the cache.
+            keyring (KeyRing): Keys selected by the "kid" header. Defaults to a
+                ring over JWT_KEY_DIR when set, else JWT_SECRET/JWT_ALGORITHM.
+            role_manager (RoleManager): Source of permission claims for
+                create_token(roles=...).
+            rate_limiter (LoginRateLimiter): Checked by authenticate_user before
+                the user lookup and password hashing.
+            user_cache_ttl (float): Seconds authenticate_user reuses a
+                user_repository result, unknown emails included; 0 disables.
+            user_cache_size (int): Emails kept in that cache.
+        """
         self.secret_key = getenv("JWT_SECRET", "default_secret")
         self.algorithm = getenv("JWT_ALGORITHM", "HS256")
         self.token_expiry_minutes = int(getenv("JWT_EXPIRY_MINUTES", 60))
+        if keyring is None and getenv("JWT_KEY_DIR"):
+            keyring = KeyRing(directory=getenv("JWT_KEY_DIR"), active_kid=getenv("JWT_ACTIVE_KID"))
+        self.keyring = keyring
+        self.role_manager = role_manager
+        self.bcrypt_rounds = int(bcrypt_rounds or getenv("BCRYPT_ROUNDS", 12))
+        self.execution = execution or getenv("AUTH_EXECUTION", "inline")
+        if self.execution not in EXECUTION_MODES:
+            raise ValueError(f"Unsupported execution mode: {self.execution}")
+        self.max_workers = int(max_workers or getenv("AUTH_HASH_WORKERS", os.cpu_count() or 4))
+        self.max_pending = int(max_pending or getenv("AUTH_MAX_PENDING_HASHES", 4 * self.max_workers))
+        self._pending = BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._executor_lock = Lock()
+        cache_size = int(token_cache_size if token_cache_size is not None
+                         else getenv("TOKEN_CACHE_SIZE", 10000))
+        self.token_cache = (
+            TokenCache(cache_size, retention=self.token_expiry_minutes * 60) if cache_size else None
+        )
+        self.rate_limiter = rate_limiter
+        self.user_cache_ttl = user_cache_ttl
+        self.user_cache_size = user_cache_size
+        self._user_cache = OrderedDict()  # normalized email -> (expires at, email, user or None)
+        self._user_cache_lock = Lock()
+        self._dummy_hash = None
+
+    def _pool(self):
+        """Create the bcrypt worker pool on first use."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    pool_class = ProcessPoolExecutor if self.execution == "process" else ThreadPoolExecutor
+                    self._executor = pool_class(max_workers=self.max_workers)
+        return self._executor
+
+    def _submit(self, fn, *args):
+        """Queue bcrypt work, failing fast once max_pending jobs are waiting."""
+        if not self._pending.acquire(blocking=False):
+            raise AuthError("Too many password checks in progress, try again later")
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def _run(self, fn, *args):
+        """Run bcrypt work according to the execution mode."""
+        if self.execution == "inline":
+            return fn(*args)
+        return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn, *args):
+        """Run bcrypt work on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def close(self):
+        """Shut down the bcrypt worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
     def hash_password(self, plain_password):
         """Hash a password using bcrypt."""
         if not plain_password:
             raise AuthError("Password cannot be empty")
-        return bcrypt.hashpw(plain_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        return self._run(hash_password_bytes, plain_password.encode("utf-8"), self.bcrypt_rounds)
 
     def verify_password(self, plain_password, hashed_password):
         """Verify a password against a hashed value."""
         if not plain_password or not hashed_password:
             raise AuthError("Invalid password provided")
-        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+        return self._run(_checkpw, plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
-    def create_token(self, user_id, additional_payload=None):
+    async def hash_password_async(self, plain_password):
+        """Hash a password on the worker pool."""
+        if not plain_password:
+            raise AuthError("Password cannot be empty")
+        return await self._run_async(hash_password_bytes, plain_password.encode("utf-8"), self.bcrypt_rounds)
+
+    async def verify_password_async(self, plain_password, hashed_password):
+        """Verify a password on the worker pool."""
+        if not plain_password or not hashed_password:
+            raise AuthError("Invalid password provided")
+        return await self._run_async(
+            _checkpw, plain_password.encode("utf-8"), hashed_password.encode("utf-8")
+        )
+
+    def needs_rehash(self, hashed_password):
+        """
+        Check whether a hash was made with a different bcrypt cost.
+
+        Args:
+            hashed_password (str): Stored bcrypt hash ("$2b$<cost>$...").
+
+        Returns:
+            bool: True if the hash should be regenerated.
+        """
+        try:
+            return int(hashed_password.split("$")[2]) != self.bcrypt_rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+    def create_token(self, user_id, additional_payload=None, roles=None):
         """
         Create a JWT for a given user ID.
 
         Args:
             user_id (str): The user ID.
             additional_payload (dict): Optional additional claims.
+            roles (str | list): Roles whose permissions are embedded as a
+                versioned bitmap, checked later with PermissionVerifier.
 
         Returns:
             str: Encoded JWT token.
@@ -46,14 +201,29 @@ class AuthService:
             "exp": datetime.utcnow() + timedelta(minutes=self.token_expiry_minutes)
         }
 
+        if self.token_cache is not None:
+            generation = self.token_cache.generation(user_id)
+            if generation:
+                payload["gen"] = generation
+
         if additional_payload:
             payload.update(additional_payload)
 
-        return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        if roles is not None:
+            if self.role_manager is None:
+                raise AuthError("A role manager is required to embed permissions")
+            payload[PERMISSION_CLAIM] = self.role_manager.permission_claim(roles)
+
+        if self.keyring is None:
+            return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        key = self.keyring.signing_key()
+        return jwt.encode(payload, key.signing_key, algorithm=key.algorithm,
+                          headers={"kid": key.kid})
 
     def decode_token(self, token):
         """
-        Decode and validate a JWT.
+        Decode and validate a JWT. Verified claims are cached until the
+        token expires, so repeat presentations skip signature checks.
 
         Args:
             token (str): The JWT.
@@ -61,14 +231,106 @@ class AuthService:
         Returns:
             dict: Decoded payload.
         """
+        cache = self.token_cache
+        if cache is not None:
+            claims = cache.get(token)
+            if claims is not None:
+                return claims
         try:
-            return jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            if self.keyring is None:
+                claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            else:
+                # The key decides the algorithm, never the token header
+                key = self.keyring.verification_key(jwt.get_unverified_header(token).get("kid"))
+                claims = jwt.decode(token, key.verifying_key, algorithms=[key.algorithm])
         except jwt.ExpiredSignatureError:
             raise AuthError("Token has expired")
-        except jwt.InvalidTokenError:
+        except jwt.PyJWTError:  # also key errors, e.g. a key unfit for its algorithm
             raise AuthError("Invalid token")
+        if cache is not None:
+            if cache.is_revoked(claims):
+                raise AuthError("Token has been revoked")
+            cache.put(token, claims)
+        return claims
 
-    def authenticate_user(self, email, password, user_repository):
+    def revoke_token(self, jti=None, sub=None, expires_at=None):
+        """
+        Reject a token by jti, or every token issued so far to a subject.
+        The denylist is kept by this process's token cache.
+
+        Args:
+            jti (str): Token id to revoke.
+            sub (str): Subject whose existing tokens are revoked.
+            expires_at (float): Unix time after which the entry can be forgotten.
+        """
+        if self.token_cache is None:
+            raise AuthError("Token revocation requires the token cache")
+        if jti is None and sub is None:
+            raise AuthError("jti or sub is required for revocation")
+        self.token_cache.revoke(jti=jti, sub=sub, expires_at=expires_at)
+
+    @staticmethod
+    def _user_cache_key(email):
+        """Emails are cached case-insensitively, as the rate limiter counts them."""
+        return email.strip().lower()
+
+    def _cached_user(self, email):
+        """
+        (found, user) from the lookup cache; user may be None for unknown
+        emails. Users are returned as copies, so callers cannot alter the
+        cached record.
+        """
+        if not self.user_cache_ttl:
+            return False, None
+        key = self._user_cache_key(email)
+        with self._user_cache_lock:
+            entry = self._user_cache.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return False, None
+            expires_at, looked_up, user = entry
+            # A miss is only reused for the exact spelling the repository saw
+            if user is None and looked_up != email:
+                return False, None
+            self._user_cache.move_to_end(key)
+        return True, copy.deepcopy(user)
+
+    def _cache_user(self, email, user):
+        """Remember a copy of a lookup result for user_cache_ttl seconds."""
+        if not self.user_cache_ttl:
+            return
+        key = self._user_cache_key(email)
+        entry = (time.monotonic() + self.user_cache_ttl, email, copy.deepcopy(user))
+        with self._user_cache_lock:
+            self._user_cache[key] = entry
+            self._user_cache.move_to_end(key)
+            while len(self._user_cache) > self.user_cache_size:
+                self._user_cache.popitem(last=False)
+
+    def invalidate_user(self, email):
+        """
+        Drop a cached user lookup, e.g. after a password change.
+
+        Args:
+            email (str): User's email, in any letter case.
+        """
+        with self._user_cache_lock:
+            self._user_cache.pop(self._user_cache_key(email), None)
+
+    def _dummy_password_hash(self):
+        """Hash checked for unknown emails so they cost as much as real ones."""
+        if self._dummy_hash is None:
+            self._dummy_hash = self._run(hash_password_bytes, DUMMY_PASSWORD, self.bcrypt_rounds)
+        return self._dummy_hash
+
+    async def _dummy_password_hash_async(self):
+        """Dummy hash computed on the pool, leaving the event loop free."""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self._run_async(
+                hash_password_bytes, DUMMY_PASSWORD, self.bcrypt_rounds
+            )
+        return self._dummy_hash
+
+    def authenticate_user(self, email, password, user_repository, on_rehash=None, ip=None):
         """
         Authenticate a user by email and password.
 
@@ -76,6 +338,50 @@ class AuthService:
             email (str): User's email.
             password (str): User's password.
             user_repository (callable): A function to fetch user details by email.
+            on_rehash (callable, optional): Called as on_rehash(user, new_hash)
+                when the stored hash used another bcrypt cost, to persist it.
+            ip (str, optional): Client address for per-IP rate limiting.
+
+        Returns:
+            dict: Authenticated user details and token.
+        """
+        if not validate_email(email):
+            raise AuthError("Invalid email format")
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.check(ip=ip, email=email)
+
+        found, user = self._cached_user(email)
+        if not found:
+            user = user_repository(email)
+            self._cache_user(email, user)
+
+        hashed_password = user.get("password") if user else None
+        if not hashed_password:
+            # Same bcrypt cost as a real check, so timing does not reveal the account
+            self.verify_password(password, self._dummy_password_hash())
+            raise AuthError("Invalid email or password")
+        if not self.verify_password(password, hashed_password):
+            raise AuthError("Invalid email or password")
+
+        if on_rehash and self.needs_rehash(hashed_password):
+            on_rehash(user, self.hash_password(password))
+            self.invalidate_user(email)
+
+        token = self.create_token(user["id"])
+        return {"user": user, "token": token}
+
+    async def authenticate_user_async(self, email, password, user_repository, on_rehash=None,
+                                      ip=None):
+        """
+        Authenticate a user without blocking the event loop on bcrypt.
+
+        Args:
+            email (str): User's email.
+            password (str): User's password.
+            user_repository (callable): Sync or async function fetching a user by email.
+            on_rehash (callable, optional): Sync or async on_rehash(user, new_hash).
+            ip (str, optional): Client address for per-IP rate limiting.
 
         Returns:
             dict: Authenticated user details and token.
@@ -83,9 +389,28 @@ class AuthService:
         if not validate_email(email):
             raise AuthError("Invalid email format")
 
-        user = user_repository(email)
-        if not user or not self.verify_password(password, user.get("password")):
+        if self.rate_limiter is not None:
+            self.rate_limiter.check(ip=ip, email=email)
+
+        found, user = self._cached_user(email)
+        if not found:
+            user = user_repository(email)
+            if inspect.isawaitable(user):
+                user = await user
+            self._cache_user(email, user)
+
+        hashed_password = user.get("password") if user else None
+        if not hashed_password:
+            await self.verify_password_async(password, await self._dummy_password_hash_async())
             raise AuthError("Invalid email or password")
+        if not await self.verify_password_async(password, hashed_password):
+            raise AuthError("Invalid email or password")
+
+        if on_rehash and self.needs_rehash(hashed_password):
+            result = on_rehash(user, await self.hash_password_async(password))
+            if inspect.isawaitable(result):
+                await result
+            self.invalidate_user(email)
 
         token = self.create_token(user["id"])
         return {"user": user, "token": token}
@@ -0,0 +1,27 @@
+"""
+Decode throughput of AuthService.decode_token with and without the token cache.
+Run from python-backend: python -m auth.bench_token_cache
+"""
+import time
+
+from auth.auth_service import AuthService
+
+ROUNDS = 20_000
+TOKENS = 100  # distinct tokens, each presented ROUNDS / TOKENS times
+
+
+def throughput(service, tokens):
+    """Decodes per second over ROUNDS calls."""
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        service.decode_token(tokens[i % len(tokens)])
+    return ROUNDS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    for label, size in (("no cache", 0), ("cache", 10000)):
+        service = AuthService(token_cache_size=size)
+        tokens = [service.create_token(f"user-{i}") for i in range(TOKENS)]
+        print(f"{label:<10} {throughput(service, tokens):>12,.0f} decodes/s")
+        if service.token_cache:
+            print(service.token_cache.stats())
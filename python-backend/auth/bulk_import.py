@@ -0,0 +1,298 @@
+import csv
+import json
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from .auth_service import AuthService, hash_password_bytes
+from .utils import validate_email
+
+MAX_ERRORS = 1000  # per-row errors kept on the report; later ones are only counted
+
+
+def read_users(path, file_format=None):
+    """
+    Lazily read user rows from a CSV (with a header) or JSONL file.
+
+    Args:
+        path (str): File to read.
+        file_format (str): "csv" or "jsonl"; inferred from the extension if omitted.
+
+    Yields:
+        tuple: (line number, row dict), or (line number, error message) for
+            lines that cannot be parsed.
+    """
+    file_format = file_format or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = f"Invalid JSON: {e}"
+                yield line_number, row if isinstance(row, (dict, str)) else "Row is not an object"
+
+
+def _hash_chunk(passwords, rounds):
+    """Hash a chunk of passwords in a worker; errors are returned per row."""
+    results = []
+    for password in passwords:
+        try:
+            results.append((hash_password_bytes(password.encode("utf-8"), rounds), None))
+        except Exception as e:  # one bad row must not fail the chunk
+            results.append((None, str(e)))
+    return results
+
+
+class ImportReport:
+    """Running totals of an import."""
+
+    __slots__ = ("processed", "imported", "failed", "errors", "max_errors", "on_error",
+                 "started_at")
+
+    def __init__(self, max_errors=MAX_ERRORS, on_error=None):
+        """
+        Args:
+            max_errors (int): Errors kept in errors; the rest are only counted
+                in failed, so bad input cannot exhaust memory.
+            on_error (callable): Called as on_error(row, message) for every
+                failed row, to stream errors elsewhere.
+        """
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []  # (row, message), first max_errors only
+        self.max_errors = max_errors
+        self.on_error = on_error
+        self.started_at = time.monotonic()
+
+    def fail(self, row, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row, message))
+        if self.on_error:
+            self.on_error(row, message)
+
+    @property
+    def rate(self):
+        """Rows processed per second."""
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "processed": self.processed,
+            "imported": self.imported,
+            "failed": self.failed,
+            "rows_per_second": round(self.rate, 1),
+        }
+
+
+class User:
+    """
+    Minimal user model for storages keyed by <class name>.id, such as
+    FileStorage. Pass user_class to BulkImporter to build your own models,
+    e.g. a SQLAlchemy User for DBStorage.
+    """
+
+    def __init__(self, **fields):
+        self.id = str(fields.pop("id", None) or uuid.uuid4())
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def to_dict(self, save_fs=None):
+        """Fields as a dict; the password hash is only kept when saving to file."""
+        data = dict(self.__dict__)
+        data["__class__"] = type(self).__name__
+        if save_fs is None:
+            data.pop("password", None)
+        return data
+
+
+def user_fields(row, password_hash):
+    """Row fields with the hash in place of the plain password."""
+    fields = {k: v for k, v in row.items() if k != "password"}
+    fields["password"] = password_hash
+    return fields
+
+
+class BulkImporter:
+    """
+    Streaming user import: rows are validated as they are read, passwords
+    are hashed in chunks across a process pool, and records are written to
+    storage in batches. At most max_pending chunks are in flight, so a slow
+    storage backend throttles reading and hashing instead of buffering the
+    whole file. Bad rows are reported and skipped.
+    """
+
+    def __init__(self, storage, auth_service=None, user_class=User, make_record=None,
+                 workers=None, chunk_size=64, batch_size=1000, max_pending=None, progress=None,
+                 progress_every=5000, max_errors=MAX_ERRORS, on_error=None):
+        """
+        Args:
+            storage: StorageManager, or any object with new()/save() and
+                optionally new_many() and rollback(objs).
+            auth_service (AuthService): Provides the bcrypt cost factor.
+            user_class (type): Model built as user_class(**fields) for each row,
+                fields being the row with the hash as "password".
+            make_record (callable): make_record(row, password_hash) -> object
+                passed to storage; overrides user_class.
+            workers (int): Hashing processes (default CPU count).
+            chunk_size (int): Passwords sent to a worker per task.
+            batch_size (int): Records per storage write and save().
+            max_pending (int): Chunks hashing or waiting; defaults to 2 per worker.
+            progress (callable): Called with the ImportReport every
+                progress_every rows and at the end.
+            progress_every (int): Rows between progress calls.
+            max_errors (int): Per-row errors kept on the report.
+            on_error (callable): Called as on_error(row, message) for every error.
+        """
+        self.storage = storage
+        self.auth_service = auth_service or AuthService()
+        self.make_record = make_record or (lambda row, password_hash: user_class(
+            **user_fields(row, password_hash)))
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.max_pending = max_pending or 2 * self.workers
+        self.progress = progress
+        self.progress_every = progress_every
+        self.max_errors = max_errors
+        self.on_error = on_error
+
+    def import_file(self, path, file_format=None):
+        """
+        Import users from a CSV or JSONL file.
+
+        Returns:
+            ImportReport: Totals and per-row errors.
+        """
+        return self.run(read_users(path, file_format))
+
+    def run(self, rows):
+        """
+        Import users from an iterable of (row number, row dict).
+
+        Args:
+            rows (iterable): e.g. read_users(path). Each row needs "email" and
+                "password".
+
+        Returns:
+            ImportReport: Totals and per-row errors.
+        """
+        report = ImportReport(self.max_errors, self.on_error)
+        next_progress = self.progress_every
+        seen = set()
+        chunk, pending, batch = [], deque(), []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for number, row in rows:
+                report.processed += 1
+                error = self._validate(row, seen)
+                if error:
+                    report.fail(number, error)
+                    continue
+                chunk.append((number, row))
+                if len(chunk) >= self.chunk_size:
+                    self._submit(executor, chunk, pending)
+                    chunk = []
+                    # Back-pressure: stop reading until the oldest chunk is done
+                    while len(pending) >= self.max_pending:
+                        self._collect(pending.popleft(), batch, report)
+                if self.progress and report.processed >= next_progress:
+                    next_progress += self.progress_every
+                    self.progress(report)
+            if chunk:
+                self._submit(executor, chunk, pending)
+            while pending:
+                self._collect(pending.popleft(), batch, report)
+        if batch:
+            self._write(batch, report)
+        if self.progress:
+            self.progress(report)
+        return report
+
+    def _validate(self, row, seen):
+        """Error message for a row that cannot be imported, or None."""
+        if isinstance(row, str):
+            return row
+        email = (row.get("email") or "").strip()
+        if not validate_email(email):
+            return "Invalid email format"
+        if not row.get("password"):
+            return "Password cannot be empty"
+        key = email.lower()
+        if key in seen:
+            return "Duplicate email"
+        seen.add(key)
+        row["email"] = email
+        return None
+
+    def _submit(self, executor, chunk, pending):
+        """Send a chunk of passwords to the pool."""
+        passwords = [row["password"] for _, row in chunk]
+        pending.append((chunk, executor.submit(_hash_chunk, passwords, self.auth_service.bcrypt_rounds)))
+
+    def _collect(self, item, batch, report):
+        """Turn a hashed chunk into records, writing full batches."""
+        chunk, future = item
+        try:
+            hashes = future.result()
+        except Exception as e:
+            for number, _ in chunk:
+                report.fail(number, f"Hashing failed: {e}")
+            return
+        for (number, row), (password_hash, error) in zip(chunk, hashes):
+            if error:
+                report.fail(number, error)
+                continue
+            try:
+                batch.append((number, self.make_record(row, password_hash)))
+            except Exception as e:
+                report.fail(number, str(e))
+        if len(batch) >= self.batch_size:
+            self._write(batch, report)
+            batch.clear()
+
+    def _write(self, batch, report):
+        """
+        Store one batch with a single save(). A failed batch is rolled back
+        and retried in halves, so only the rows that fail on their own are
+        reported and the rest of the batch is still imported.
+        """
+        records = [record for _, record in batch]
+        try:
+            if hasattr(self.storage, "new_many"):
+                self.storage.new_many(records)
+            else:
+                for record in records:
+                    self.storage.new(record)
+            self.storage.save()
+        except Exception as e:
+            # Leave the storage clean so retries and later batches are not poisoned
+            self._discard(records)
+            if len(batch) == 1:
+                report.fail(batch[0][0], f"Storage write failed: {e}")
+                return
+            middle = len(batch) // 2
+            self._write(batch[:middle], report)
+            self._write(batch[middle:], report)
+            return
+        report.imported += len(records)
+
+    def _discard(self, records):
+        """Undo a failed batch: roll back the session, or drop the staged objects."""
+        try:
+            if hasattr(self.storage, "rollback"):
+                self.storage.rollback(records)
+            else:
+                for record in records:
+                    self.storage.delete(record)
+        except Exception:
+            pass  # the batch is already reported as failed
@@ -6,3 +6,10 @@ class AuthError(Exception):
 
     def __str__(self):
         return f"AuthError: {self.message}"
+
+
+class RateLimitError(AuthError):
+    """Raised when too many attempts were made; retry_after is in seconds."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
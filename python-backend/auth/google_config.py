@@ -3,4 +3,5 @@ google_config = {
     "client_secret": "YOUR_GOOGLE_CLIENT_SECRET",
     "token_url": "https://oauth2.googleapis.com/token",
     "user_info_url": "https://www.googleapis.com/oauth2/v2/userinfo",
+    "discovery_url": "https://accounts.google.com/.well-known/openid-configuration",
 }
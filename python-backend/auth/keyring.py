@@ -0,0 +1,247 @@
+import os
+import time
+from threading import Lock
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from .errors import AuthError
+
+EC_ALGORITHMS = {"secp256r1": "ES256", "secp384r1": "ES384", "secp521r1": "ES512"}
+
+
+def parse_key(material, allow_secret=True):
+    """
+    Parse key material once into a key object PyJWT can use directly.
+
+    Args:
+        material (str | bytes | key object): PEM private or public key, an
+            HMAC secret, or an already parsed cryptography key.
+        allow_secret (bool): Accept material that is not PEM as an HMAC
+            secret; off for files found by scanning a directory.
+
+    Returns:
+        object: Private key, public key, or secret bytes.
+
+    Raises:
+        ValueError: For PEM blocks that are not keys, such as certificates,
+            and for secrets when allow_secret is off.
+    """
+    if not isinstance(material, (str, bytes)):
+        return material
+    data = material.encode("utf-8") if isinstance(material, str) else material
+    if b"PRIVATE KEY-----" in data:
+        return serialization.load_pem_private_key(data, password=None)
+    if b"PUBLIC KEY-----" in data:
+        return serialization.load_pem_public_key(data)
+    if b"-----BEGIN " in data:
+        raise ValueError("PEM data is not a private or public key")
+    if not allow_secret:
+        raise ValueError("Not a PEM key")
+    return data
+
+
+def infer_algorithm(key):
+    """
+    Pick the JWT algorithm matching a parsed key.
+
+    Args:
+        key (object): Result of parse_key.
+
+    Returns:
+        str: JWT "alg" value.
+    """
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return "RS256"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        return EC_ALGORITHMS[key.curve.name]
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey,
+                        ed448.Ed448PrivateKey, ed448.Ed448PublicKey)):
+        return "EdDSA"
+    return "HS256"
+
+
+class SigningKey:
+    """One parsed key of the ring."""
+
+    __slots__ = ("kid", "algorithm", "signing_key", "verifying_key")
+
+    def __init__(self, kid, material, algorithm=None, allow_secret=True):
+        """
+        Args:
+            kid (str): Key id written to the token header.
+            material: Anything parse_key accepts.
+            algorithm (str): JWT algorithm; inferred from the key if omitted.
+            allow_secret (bool): Passed to parse_key.
+        """
+        key = parse_key(material, allow_secret)
+        self.kid = kid
+        self.algorithm = algorithm or infer_algorithm(key)
+        if hasattr(key, "public_key"):
+            self.signing_key, self.verifying_key = key, key.public_key()
+        elif isinstance(key, bytes):
+            self.signing_key = self.verifying_key = key
+        else:
+            self.signing_key, self.verifying_key = None, key
+
+
+class KeyRing:
+    """
+    JWT keys indexed by kid. Keys are parsed once; new keys come from a
+    directory of PEM files or a loader callback without a restart, and
+    tokens are always signed with the active key.
+    """
+
+    def __init__(self, keys=None, active_kid=None, directory=None, loader=None,
+                 reload_interval=60):
+        """
+        Args:
+            keys (dict): kid -> key material, or (material, algorithm).
+            active_kid (str): kid used for signing. For directories, defaults to
+                the kid in an "active" file, else the newest private key.
+            directory (str): Folder of "<kid>.pem" files, private or public.
+                Other files, certificates included, are skipped and listed in
+                rejected_files; HMAC secrets must be passed as keys or by loader.
+            loader (callable): Returns (keys, active_kid) in the format above.
+            reload_interval (int): Minimum seconds between automatic reloads,
+                which happen on an unknown kid or when the interval elapses.
+        """
+        self.directory = directory
+        self.loader = loader
+        self.reload_interval = reload_interval
+        self._configured_active = active_kid
+        self._static = {kid: self._entry(kid, value) for kid, value in (keys or {}).items()}
+        self._keys = {}
+        self._active = None
+        self._parsed_files = {}  # path -> ((mtime, size), SigningKey)
+        self._parsed_loaded = {}  # kid -> (loader value, SigningKey)
+        self._rejected_files = {}  # path -> ((mtime, size), reason it is not in the ring)
+        self._last_reload = 0.0
+        self._lock = Lock()
+        self.reload()
+
+    def reload(self):
+        """Rebuild the ring; unchanged files and loader keys are not parsed again."""
+        with self._lock:
+            keys = dict(self._static)
+            active = self._configured_active
+            if self.directory:
+                found, newest = self._scan_directory()
+                keys.update(found)
+                active = active or self._read_active_file() or newest
+            if self.loader:
+                loaded, loaded_active = self.loader()
+                keys.update(self._parse_loaded(loaded))
+                active = loaded_active or active
+            if active is None and len(keys) == 1:
+                active = next(iter(keys))
+            # Swap whole references so readers never see a half-built ring
+            self._keys = keys
+            self._active = active
+            self._last_reload = time.monotonic()
+
+    def _entry(self, kid, value):
+        """Build a SigningKey from material or (material, algorithm)."""
+        if isinstance(value, SigningKey):
+            return value
+        if isinstance(value, tuple):
+            return SigningKey(kid, *value)
+        return SigningKey(kid, value)
+
+    def _parse_loaded(self, loaded):
+        """SigningKeys for loader output, reusing those whose value is unchanged."""
+        parsed = {}
+        for kid, value in loaded.items():
+            cached = self._parsed_loaded.get(kid)
+            if cached and (cached[0] is value or cached[0] == value):
+                parsed[kid] = cached
+            else:
+                parsed[kid] = (value, self._entry(kid, value))
+        self._parsed_loaded = parsed
+        return {kid: key for kid, (_, key) in parsed.items()}
+
+    def _scan_directory(self):
+        """Parse new or modified PEM files; returns (keys, newest private kid)."""
+        keys, parsed, rejected, newest, newest_mtime = {}, {}, {}, None, -1
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".pem"):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            version = (stat.st_mtime_ns, stat.st_size)
+            cached = self._parsed_files.get(path)
+            failed = self._rejected_files.get(path)
+            if cached and cached[0] == version:
+                key = cached[1]
+            elif failed and failed[0] == version:
+                rejected[path] = failed
+                continue
+            else:
+                try:
+                    with open(path, "rb") as f:
+                        key = SigningKey(name[:-len(".pem")], f.read(), allow_secret=False)
+                except (ValueError, TypeError) as e:
+                    # One stray file, e.g. a certificate, must not break the ring
+                    rejected[path] = (version, str(e))
+                    continue
+            parsed[path] = (version, key)
+            keys[key.kid] = key
+            if key.signing_key is not None and stat.st_mtime_ns > newest_mtime:
+                newest, newest_mtime = key.kid, stat.st_mtime_ns
+        self._parsed_files = parsed
+        self._rejected_files = rejected
+        return keys, newest
+
+    @property
+    def rejected_files(self):
+        """path -> reason, for .pem files in the directory that hold no usable key."""
+        return {path: reason for path, (_, reason) in self._rejected_files.items()}
+
+    def _read_active_file(self):
+        """kid named in the directory's "active" file, if any."""
+        path = os.path.join(self.directory, "active")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return f.read().strip() or None
+
+    def _maybe_reload(self, force=False):
+        """Reload when due; force skips the wait only if something can change."""
+        if not (self.directory or self.loader):
+            return
+        elapsed = time.monotonic() - self._last_reload
+        if elapsed >= self.reload_interval or (force and elapsed >= 1):
+            self.reload()
+
+    def signing_key(self):
+        """
+        Returns:
+            SigningKey: The active key.
+        """
+        self._maybe_reload()
+        key = self._keys.get(self._active)
+        if key is None or key.signing_key is None:
+            raise AuthError("No active signing key")
+        return key
+
+    def verification_key(self, kid):
+        """
+        Look up a verification key by kid in O(1), reloading once on a miss.
+
+        Args:
+            kid (str): kid from the token header.
+
+        Returns:
+            SigningKey: The matching key.
+        """
+        self._maybe_reload()
+        key = self._keys.get(kid)
+        if key is None:
+            self._maybe_reload(force=True)
+            key = self._keys.get(kid)
+            if key is None:
+                raise AuthError("Unknown signing key")
+        return key
+
+    @property
+    def kids(self):
+        """kids currently in the ring."""
+        return list(self._keys)
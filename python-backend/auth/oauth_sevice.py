@@ -1,22 +1,122 @@
+import hashlib
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from threading import Lock, RLock
+import jwt
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .errors import AuthError
 
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_METADATA_TTL = 3600  # seconds, when the provider sends no cache headers
+JWKS_REFETCH_INTERVAL = 30  # minimum seconds between refetches for unknown kids
+
+
+def cache_lifetime(headers, default=DEFAULT_METADATA_TTL):
+    """
+    Seconds a response may be reused, from Cache-Control or Expires.
+
+    Args:
+        headers (Mapping): Response headers.
+        default (int): Lifetime when neither header is present.
+
+    Returns:
+        float: Remaining freshness in seconds.
+    """
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    if directives.get("max-age", "").isdigit():
+        return max(0, int(directives["max-age"]) - int(headers.get("Age", 0) or 0))
+    if "Expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            return 0
+        return max(0, expires - time.time())
+    return default
+
+
+def build_session(pool_maxsize=20, retries=3, backoff_factor=0.3, backoff_jitter=0.3):
+    """
+    Create a pooled requests.Session that retries transient failures.
+
+    Connection errors are retried for every method. Responses with a retry
+    status are retried only for GET, so a single-use authorization code is
+    never POSTed twice. Retry-After headers are honoured.
+
+    Args:
+        pool_maxsize (int): Keep-alive connections kept per host.
+        retries (int): Maximum retries per request.
+        backoff_factor (float): Base of the exponential backoff, in seconds.
+        backoff_jitter (float): Random seconds added to each backoff.
+
+    Returns:
+        requests.Session: Session with the adapter mounted for http and https.
+    """
+    options = dict(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    try:
+        retry = Retry(backoff_jitter=backoff_jitter, **options)
+    except TypeError:  # urllib3 < 2 has no jitter
+        retry = Retry(**options)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class OAuthService:
     """OAuth integration for third-party authentication."""
 
-    def __init__(self, provider_config):
+    def __init__(self, provider_config, session=None, timeout=(3.05, 10), pool_maxsize=20,
+                 retries=3, user_info_ttl=60, user_info_cache_size=1024):
         """
         Initialize with provider configuration.
 
         Args:
             provider_config (dict): Config for OAuth provider (e.g., Google).
+            session (requests.Session): Shared session; one from build_session
+                is created if omitted.
+            timeout (float | tuple): Connect and read timeouts in seconds.
+            pool_maxsize (int): Keep-alive connections kept per host.
+            retries (int): Retries on connection errors and 429/5xx.
+            user_info_ttl (int): Seconds user info is cached per access token;
+                0 disables the cache.
+            user_info_cache_size (int): Access tokens kept in the cache.
         """
         self.client_id = provider_config.get("client_id")
         self.client_secret = provider_config.get("client_secret")
         self.token_url = provider_config.get("token_url")
         self.user_info_url = provider_config.get("user_info_url")
+        self.discovery_url = provider_config.get("discovery_url")
+        if not self.discovery_url and provider_config.get("issuer"):
+            self.discovery_url = (
+                provider_config["issuer"].rstrip("/") + "/.well-known/openid-configuration"
+            )
         if not all([self.client_id, self.client_secret, self.token_url, self.user_info_url]):
             raise AuthError("Invalid OAuth provider configuration")
+        self.session = session or build_session(pool_maxsize=pool_maxsize, retries=retries)
+        self.timeout = timeout
+        self.user_info_ttl = user_info_ttl
+        self.user_info_cache_size = user_info_cache_size
+        self._user_info = OrderedDict()  # token digest -> (expires at, user info)
+        self._lock = Lock()
+        self._discovery = None  # (expires at, document)
+        self._jwks = None  # (expires at, fetched at, {kid: PyJWK})
+        self._metadata_lock = RLock()
 
     def exchange_code_for_token(self, code, redirect_uri):
         """
@@ -30,7 +130,7 @@ class OAuthService:
             dict: Token response.
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.token_url,
                 data={
                     "code": code,
@@ -38,7 +138,8 @@ class OAuthService:
                     "client_secret": self.client_secret,
                     "redirect_uri": redirect_uri,
                     "grant_type": "authorization_code",
-                }
+                },
+                timeout=self.timeout,
             )
             response.raise_for_status()
             return response.json()
@@ -47,7 +148,8 @@ class OAuthService:
 
     def get_user_info(self, access_token):
         """
-        Retrieve user information using the access token.
+        Retrieve user information using the access token. Results are cached
+        for user_info_ttl seconds under a digest of the token.
 
         Args:
             access_token (str): OAuth access token.
@@ -55,12 +157,193 @@ class OAuthService:
         Returns:
             dict: User information.
         """
+        digest = hashlib.sha256(access_token.encode("utf-8")).digest()
+        cached = self._cached_user_info(digest)
+        if cached is not None:
+            return cached
         try:
-            response = requests.get(
+            response = self.session.get(
                 self.user_info_url,
-                headers={"Authorization": f"Bearer {access_token}"}
+                headers={"Authorization": f"Bearer {access_token}"},
+                timeout=self.timeout,
             )
             response.raise_for_status()
-            return response.json()
+            user_info = response.json()
         except requests.exceptions.RequestException as e:
             raise AuthError(f"Failed to retrieve user info: {e}")
+        self._store_user_info(digest, user_info)
+        return user_info
+
+    def _cached_user_info(self, digest):
+        """Cached user info for a token digest, or None."""
+        if not self.user_info_ttl:
+            return None
+        with self._lock:
+            entry = self._user_info.get(digest)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._user_info[digest]
+                return None
+            self._user_info.move_to_end(digest)
+            return dict(entry[1])
+
+    def _store_user_info(self, digest, user_info):
+        """Cache user info, dropping the least recently used tokens."""
+        if not self.user_info_ttl:
+            return
+        with self._lock:
+            self._user_info[digest] = (time.monotonic() + self.user_info_ttl, dict(user_info))
+            self._user_info.move_to_end(digest)
+            while len(self._user_info) > self.user_info_cache_size:
+                self._user_info.popitem(last=False)
+
+    def _fetch_cacheable(self, url):
+        """GET a JSON document; returns (document, seconds it stays fresh)."""
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json(), cache_lifetime(response.headers)
+
+    def discovery(self):
+        """
+        The provider's OpenID configuration, cached per its HTTP cache headers.
+
+        Returns:
+            dict: Discovery document, or None if no discovery_url/issuer is set.
+        """
+        if not self.discovery_url:
+            return None
+        cached = self._discovery
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        with self._metadata_lock:
+            cached = self._discovery
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            try:
+                document, ttl = self._fetch_cacheable(self.discovery_url)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                raise AuthError(f"Failed to fetch OpenID configuration: {e}")
+            self._discovery = (time.monotonic() + ttl, document)
+            return document
+
+    def _signing_keys(self, force=False):
+        """kid -> PyJWK from the provider's JWKS, parsed once per fetch."""
+        now = time.monotonic()
+        cached = self._jwks
+        if cached and cached[0] > now and not force:
+            return cached[2]
+        with self._metadata_lock:
+            cached = self._jwks
+            if cached and not force and cached[0] > now:
+                return cached[2]
+            # Unknown kids must not turn into a refetch per request
+            if cached and force and now - cached[1] < JWKS_REFETCH_INTERVAL:
+                return cached[2]
+            jwks_uri = self.discovery()["jwks_uri"]
+            try:
+                document, ttl = self._fetch_cacheable(jwks_uri)
+                key_set = jwt.PyJWKSet.from_dict(document)
+            except (requests.exceptions.RequestException, ValueError, jwt.PyJWKSetError) as e:
+                raise AuthError(f"Failed to fetch provider signing keys: {e}")
+            keys = {key.key_id: key for key in key_set.keys}
+            self._jwks = (now + ttl, now, keys)
+            return keys
+
+    def verify_id_token(self, id_token, nonce=None):
+        """
+        Verify an OIDC id_token locally against the provider's JWKS.
+
+        Args:
+            id_token (str): The id_token from the token response.
+            nonce (str): Nonce sent in the authorization request, if any.
+
+        Returns:
+            dict: Verified id_token claims.
+        """
+        metadata = self.discovery()
+        if metadata is None:
+            raise AuthError("OpenID discovery is not configured")
+        return self._verify_id_token(id_token, self._signing_key(id_token), metadata, nonce)
+
+    def _signing_key(self, id_token):
+        """The JWKS key an id_token names in its kid header."""
+        try:
+            kid = jwt.get_unverified_header(id_token).get("kid")
+        except jwt.InvalidTokenError:
+            raise AuthError("Invalid id_token")
+        key = self._signing_keys().get(kid) or self._signing_keys(force=True).get(kid)
+        if key is None:
+            raise AuthError("Unknown id_token signing key")
+        return key
+
+    def _verify_id_token(self, id_token, key, metadata, nonce):
+        """Check an id_token's signature and claims with a retrieved key."""
+        algorithm = key.algorithm_name
+        allowed = metadata.get("id_token_signing_alg_values_supported")
+        if allowed and algorithm not in allowed:
+            raise AuthError("Unsupported id_token signing algorithm")
+        try:
+            claims = jwt.decode(
+                id_token, key.key, algorithms=[algorithm], audience=self.client_id,
+                issuer=metadata.get("issuer"), options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+            )
+        except jwt.ExpiredSignatureError:
+            raise AuthError("id_token has expired")
+        except jwt.InvalidTokenError as e:
+            raise AuthError(f"Invalid id_token: {e}")
+        if nonce is not None and claims.get("nonce") != nonce:
+            raise AuthError("id_token nonce mismatch")
+        return claims
+
+    def authenticate(self, code, redirect_uri, nonce=None):
+        """
+        Exchange a code and identify the user. A returned id_token is
+        verified locally, saving the user info round trip; user_info_url
+        is used when there is no id_token, or when the discovery document,
+        the JWKS or the id_token's signing key cannot be retrieved. An
+        id_token that fails verification is rejected, not skipped.
+
+        Args:
+            code (str): Authorization code.
+            redirect_uri (str): Redirect URI registered with the provider.
+            nonce (str): Nonce sent in the authorization request, if any.
+
+        Returns:
+            dict: {"token": token response, "user": user claims or info},
+                the user always carrying string "sub" and "id" fields.
+        """
+        token = self.exchange_code_for_token(code, redirect_uri)
+        id_token = token.get("id_token")
+        if id_token and self.discovery_url:
+            try:
+                metadata = self.discovery()
+                key = self._signing_key(id_token)
+            except AuthError:
+                pass  # provider metadata or keys unavailable: fall back to user info
+            else:
+                claims = self._verify_id_token(id_token, key, metadata, nonce)
+                return {"token": token, "user": self.normalize_user(claims)}
+        user_info = self.get_user_info(token["access_token"])
+        return {"token": token, "user": self.normalize_user(user_info)}
+
+    @staticmethod
+    def normalize_user(user):
+        """
+        Give id_token claims and user info responses one shape.
+
+        Args:
+            user (dict): Claims or user info; OIDC providers send "sub",
+                plain OAuth providers often only "id".
+
+        Returns:
+            dict: A copy with both "sub" and "id" set to the same string.
+        """
+        user_id = user.get("sub", user.get("id"))
+        if user_id is None:
+            raise AuthError("Provider returned no user id")
+        return dict(user, sub=str(user_id), id=str(user_id))
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
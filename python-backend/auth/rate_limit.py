@@ -0,0 +1,142 @@
+import time
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+from .errors import RateLimitError
+
+# Token bucket in one round trip: refill by elapsed server time, then spend
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class MemoryRateLimitBackend:
+    """Per-process token buckets, least recently used dropped beyond max_keys."""
+
+    def __init__(self, max_keys=100000):
+        """
+        Args:
+            max_keys (int): Buckets kept; the idlest are dropped first, and an
+                idle bucket has refilled anyway.
+        """
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, last refill)
+        self.lock = Lock()
+
+    def consume(self, key, capacity, rate, cost=1):
+        """
+        Take cost tokens from a bucket.
+
+        Args:
+            key (str): Bucket name.
+            capacity (float): Bucket size, i.e. the allowed burst.
+            rate (float): Tokens added per second.
+            cost (float): Tokens this attempt uses.
+
+        Returns:
+            tuple: (allowed, seconds until enough tokens are available).
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared by every process, updated atomically by a Lua script."""
+
+    def __init__(self, client=None, prefix="ratelimit"):
+        """
+        Args:
+            client (redis.Redis): Client to use; one for REDIS_HOST/PORT/DB is
+                created on first use if omitted.
+            prefix (str): Key prefix for the buckets.
+        """
+        self.client = client
+        self.prefix = prefix
+        self._script = None
+
+    def consume(self, key, capacity, rate, cost=1):
+        """
+        Take cost tokens from a bucket; see MemoryRateLimitBackend.consume.
+        Buckets expire once they would be full again.
+        """
+        if self._script is None:
+            if self.client is None:
+                import redis
+                self.client = redis.StrictRedis(
+                    host=getenv("REDIS_HOST", "localhost"),
+                    port=int(getenv("REDIS_PORT", 6379)),
+                    db=int(getenv("REDIS_DB", 0)),
+                )
+            self._script = self.client.register_script(TOKEN_BUCKET_LUA)
+        allowed, retry_after = self._script(
+            keys=[f"{self.prefix}:{key}"], args=[capacity, rate, cost]
+        )
+        return bool(allowed), float(retry_after)
+
+
+class LoginRateLimiter:
+    """Token-bucket limits on login attempts per client IP and per email."""
+
+    def __init__(self, backend=None, per_ip=(20, 60), per_email=(5, 300)):
+        """
+        Args:
+            backend: MemoryRateLimitBackend (default) or RedisRateLimitBackend.
+            per_ip (tuple): (attempts, seconds) allowed per IP; None disables.
+            per_email (tuple): (attempts, seconds) allowed per email; None disables.
+        """
+        self.backend = backend or MemoryRateLimitBackend()
+        self.per_ip = per_ip
+        self.per_email = per_email
+
+    def _consume(self, key, limit):
+        """Spend one attempt from a bucket refilling limit[0] per limit[1] seconds."""
+        attempts, seconds = limit
+        allowed, retry_after = self.backend.consume(key, attempts, attempts / seconds)
+        if not allowed:
+            raise RateLimitError("Too many login attempts, try again later", retry_after)
+
+    def check(self, ip=None, email=None):
+        """
+        Record a login attempt, raising before any lookup or hashing happens.
+
+        Args:
+            ip (str): Client address.
+            email (str): Email being logged into.
+
+        Raises:
+            RateLimitError: If either limit is exhausted.
+        """
+        # IP first, so a blocked source does not also drain the account's bucket
+        if ip and self.per_ip:
+            self._consume(f"ip:{ip}", self.per_ip)
+        if email and self.per_email:
+            self._consume(f"email:{email.strip().lower()}", self.per_email)
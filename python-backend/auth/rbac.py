@@ -1,40 +1,346 @@
+import base64
+import hashlib
+import json
+from threading import Lock
+from .errors import AuthError
+
+WILDCARD = "*"
+PERMISSION_CLAIM = "perm"
+
+
 class RoleManager:
-    """Manages role-based access control (RBAC)."""
+    """
+    Manages role-based access control (RBAC).
+
+    Permissions are interned to integer ids and every role resolves to a
+    bitmask covering its inherited roles and expanded "resource:*"
+    wildcards. The masks are rebuilt once after roles change, so checks
+    cost a few integer operations however deep the hierarchy is.
+    """
 
     def __init__(self):
         self.roles = {}
+        self.parents = {}
+        self.permission_ids = {}
+        self.permission_names = []
+        self._masks = {}
+        self._resolved = {}
+        self._ranks = {}
+        self._version = None
+        self._dirty = False
+        self._lock = Lock()
 
-    def add_role(self, role_name, permissions):
+    def add_role(self, role_name, permissions, inherits=None):
         """
         Add a role with associated permissions.
 
         Args:
             role_name (str): The name of the role.
-            permissions (list): List of permissions for the role.
+            permissions (list): List of permissions for the role. A trailing
+                "*" grants every permission with that prefix, e.g. "posts:*".
+            inherits (list): Roles whose permissions this role also gets.
+                They may be added later.
+        """
+        with self._lock:
+            self.roles[role_name] = set(permissions)
+            self.parents[role_name] = list(inherits or [])
+            for permission in permissions:
+                self._intern(permission)
+            self._dirty = True
+
+    def remove_role(self, role_name):
+        """
+        Remove a role. Roles inheriting from it lose its permissions.
+
+        Args:
+            role_name (str): The role name.
+        """
+        with self._lock:
+            self.roles.pop(role_name, None)
+            self.parents.pop(role_name, None)
+            self._dirty = True
+
+    def register_permissions(self, permissions):
+        """
+        Declare permissions no role names directly, so wildcard grants
+        expand to them ahead of time.
+
+        Args:
+            permissions (list): Permission names.
+        """
+        with self._lock:
+            for permission in permissions:
+                self._intern(permission)
+            self._dirty = True
+
+    def _intern(self, permission):
+        """Permission id, assigning the next bit on first sight. Ids never change."""
+        pid = self.permission_ids.get(permission)
+        if pid is None:
+            pid = self.permission_ids[permission] = len(self.permission_names)
+            self.permission_names.append(permission)
+        return pid
+
+    def _rebuild(self):
+        """Recompute every role's transitive mask and permission list."""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Each wildcard covers itself and every known permission it prefixes
+            covers = {}
+            for name, pid in self.permission_ids.items():
+                if name.endswith(WILDCARD):
+                    covers[name] = 1 << pid
+            for name, pid in self.permission_ids.items():
+                for wildcard in covers:
+                    if name.startswith(wildcard[:-1]):
+                        covers[wildcard] |= 1 << pid
+
+            own = {}
+            for role, permissions in self.roles.items():
+                mask = 0
+                for permission in permissions:
+                    mask |= covers.get(permission) or 1 << self.permission_ids[permission]
+                own[role] = mask
+
+            masks = {}
+
+            def resolve(role, path):
+                if role in masks:
+                    return masks[role]
+                if role in path:
+                    raise AuthError(f"Role inheritance cycle: {' -> '.join(path + [role])}")
+                mask = own.get(role, 0)
+                for parent in self.parents.get(role, ()):
+                    mask |= resolve(parent, path + [role])
+                masks[role] = mask
+                return mask
+
+            for role in self.roles:
+                resolve(role, [])
+            self._masks = masks
+            self._resolved = {}
+            # Tokens number permissions by sorted name, so processes that
+            # loaded the same roles in another order agree on the bits
+            names = sorted(self.permission_ids)
+            self._ranks = {name: rank for rank, name in enumerate(names)}
+            policy = {
+                "permissions": names,
+                "roles": {role: sorted(perms) for role, perms in self.roles.items()},
+                "parents": {role: sorted(parents) for role, parents in self.parents.items()},
+            }
+            self._version = hashlib.blake2b(
+                json.dumps(policy, sort_keys=True).encode("utf-8"), digest_size=8
+            ).hexdigest()
+            self._dirty = False
+
+    def role_mask(self, role_names):
         """
-        self.roles[role_name] = set(permissions)
+        Combined permission mask of one or more roles.
+
+        Args:
+            role_names (str | list): A role name or a user's roles.
+
+        Returns:
+            int: Bitmask of permission ids.
+        """
+        if self._dirty:
+            self._rebuild()
+        masks = self._masks
+        if isinstance(role_names, str):
+            return masks.get(role_names, 0)
+        mask = 0
+        for role in role_names:
+            mask |= masks.get(role, 0)
+        return mask
+
+    def permission_mask(self, permissions):
+        """
+        Bitmask for a set of permissions.
+
+        Args:
+            permissions (list): Permission names.
+
+        Returns:
+            int: Bitmask, or None if any permission is unknown.
+        """
+        ids = self.permission_ids
+        mask = 0
+        for permission in permissions:
+            pid = ids.get(permission)
+            if pid is None:
+                return None
+            mask |= 1 << pid
+        return mask
+
+    def _granted(self, mask, permission, ids=None):
+        """Check one permission against a resolved mask numbered by ids."""
+        ids = ids if ids is not None else self.permission_ids
+        pid = ids.get(permission)
+        if pid is not None:
+            return bool(mask >> pid & 1)
+        # Not known ahead of time: only a wildcard grant can cover it
+        parts = permission.split(":")
+        for i in range(len(parts)):
+            wid = ids.get(":".join(parts[:i] + [WILDCARD]))
+            if wid is not None and mask >> wid & 1:
+                return True
+        return False
 
     def check_permission(self, role_name, permission):
         """
         Check if a role has a specific permission.
 
         Args:
-            role_name (str): The role name.
+            role_name (str | list): The role name, or several roles.
             permission (str): The permission to check.
 
         Returns:
             bool: True if the role has the permission, otherwise False.
         """
-        return permission in self.roles.get(role_name, set())
+        return self._granted(self.role_mask(role_name), permission)
+
+    def check_all(self, role_names, permissions):
+        """
+        Check that roles hold every listed permission.
+
+        Args:
+            role_names (str | list): A role name or a user's roles.
+            permissions (list): Permissions that are all required.
+
+        Returns:
+            bool: True if every permission is granted.
+        """
+        mask = self.role_mask(role_names)
+        required = self.permission_mask(permissions)
+        if required is not None:
+            return mask & required == required
+        return all(self._granted(mask, permission) for permission in permissions)
+
+    def check_any(self, role_names, permissions):
+        """
+        Check that roles hold at least one listed permission.
+
+        Args:
+            role_names (str | list): A role name or a user's roles.
+            permissions (list): Permissions of which one is enough.
+
+        Returns:
+            bool: True if any permission is granted.
+        """
+        mask = self.role_mask(role_names)
+        wanted = self.permission_mask(permissions)
+        if wanted is not None:
+            return bool(mask & wanted)
+        return any(self._granted(mask, permission) for permission in permissions)
 
     def get_permissions(self, role_name):
         """
-        Retrieve all permissions for a role.
+        Retrieve all permissions for a role, including inherited ones and
+        known permissions matched by its wildcards.
 
         Args:
             role_name (str): The role name.
 
         Returns:
-            list: List of permissions.
+            list: Permissions; a fresh list resolved from a cache kept
+                until roles change.
+        """
+        mask = self.role_mask(role_name)
+        resolved = self._resolved.get(role_name)
+        if resolved is None:
+            names = self.permission_names
+            resolved = tuple(names[pid] for pid in range(mask.bit_length()) if mask >> pid & 1)
+            self._resolved[role_name] = resolved
+        return list(resolved)
+
+    def policy_version(self):
+        """
+        Digest of the role definitions; changes whenever roles change.
+
+        Returns:
+            str: Hex version string.
+        """
+        if self._dirty:
+            self._rebuild()
+        return self._version
+
+    def permission_claim(self, role_names):
+        """
+        Compact token claim with the roles' permissions.
+
+        Args:
+            role_names (str | list): A role name or a user's roles.
+
+        Returns:
+            dict: {"v": policy version, "p": base64url permission bitmap}.
+        """
+        mask = self.role_mask(role_names)
+        names, ranks = self.permission_names, self._ranks
+        bitmap = 0
+        for pid in range(mask.bit_length()):
+            if mask >> pid & 1:
+                bitmap |= 1 << ranks[names[pid]]
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        return {"v": self._version, "p": base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")}
+
+
+class PermissionVerifier:
+    """Answers permission checks from decoded token claims, without role lookups."""
+
+    def __init__(self, role_manager, claim=PERMISSION_CLAIM):
+        """
+        Args:
+            role_manager (RoleManager): Roles the tokens were issued against.
+            claim (str): Claim holding the permission bitmap.
+        """
+        self.role_manager = role_manager
+        self.claim = claim
+
+    def _mask(self, claims):
+        """Bitmap from claims, rejecting tokens issued under older roles."""
+        value = claims.get(self.claim)
+        if not value:
+            raise AuthError("Token has no permission claim")
+        if value.get("v") != self.role_manager.policy_version():
+            raise AuthError("Token permissions are out of date")
+        data = value["p"]
+        return int.from_bytes(base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)), "little")
+
+    def check_permission(self, claims, permission):
+        """
+        Check a permission carried by a token.
+
+        Args:
+            claims (dict): Output of AuthService.decode_token.
+            permission (str): The permission to check.
+
+        Returns:
+            bool: True if the token grants the permission.
+        """
+        manager = self.role_manager
+        return manager._granted(self._mask(claims), permission, manager._ranks)
+
+    def check_all(self, claims, permissions):
+        """
+        Args:
+            claims (dict): Decoded token claims.
+            permissions (list): Permissions that are all required.
+
+        Returns:
+            bool: True if every permission is granted.
+        """
+        manager, mask = self.role_manager, self._mask(claims)
+        return all(manager._granted(mask, p, manager._ranks) for p in permissions)
+
+    def check_any(self, claims, permissions):
+        """
+        Args:
+            claims (dict): Decoded token claims.
+            permissions (list): Permissions of which one is enough.
+
+        Returns:
+            bool: True if any permission is granted.
         """
-        return list(self.roles.get(role_name, []))
+        manager, mask = self.role_manager, self._mask(claims)
+        return any(manager._granted(mask, p, manager._ranks) for p in permissions)
@@ -1,27 +1,85 @@
+import heapq
+import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
+from itertools import count
+from threading import Lock
+
+SWEEP_BATCH = 16  # expired sessions dropped per call, keeping each call O(log n)
+
+
+class Session:
+    """Compact per-session record."""
+
+    __slots__ = ("session_id", "user_id", "expires_at", "refreshed_at", "data")
+
+    def __init__(self, session_id, user_id, expires_at, refreshed_at, data):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.refreshed_at = refreshed_at
+        self.data = data
+
+    def to_dict(self):
+        """Public view of the session."""
+        session = dict(self.data) if self.data else {}
+        session["user_id"] = self.user_id
+        session["expires_at"] = datetime.utcfromtimestamp(self.expires_at)
+        return session
+
 
 class SessionManager:
     """Manages user sessions."""
 
-    def __init__(self, expiry_minutes=60):
+    def __init__(self, expiry_minutes=60, sliding=False, refresh_interval=None,
+                 max_sessions_per_user=None):
+        """
+        Args:
+            expiry_minutes (int): Session lifetime, or idle timeout when sliding.
+            sliding (bool): Extend a session's expiry each time it is used.
+                Off by default, so sessions keep their fixed lifetime.
+            refresh_interval (float): Minimum seconds between two extensions of
+                one session; defaults to a tenth of the lifetime.
+            max_sessions_per_user (int): When reached, a new session replaces
+                the user's oldest one.
+        """
         self.sessions = {}  # Replace with a persistent store like Redis if needed
         self.expiry_minutes = expiry_minutes
+        self.sliding = sliding
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None else expiry_minutes * 6
+        )
+        self.max_sessions_per_user = max_sessions_per_user
+        self.user_sessions = {}  # user_id -> {session_id: None}, oldest first
+        self._expiry_heap = []
+        self._seq = count()
+        self._lock = Lock()
 
-    def create_session(self, user_id):
+    def create_session(self, user_id, data=None):
         """
         Create a new session for a user.
 
         Args:
             user_id (str): The ID of the user.
+            data (dict): Optional extra values stored with the session.
 
         Returns:
             dict: Session details, including session ID and expiry.
         """
+        now = time.time()
         session_id = str(uuid.uuid4())
-        expiry_time = datetime.utcnow() + timedelta(minutes=self.expiry_minutes)
-        self.sessions[session_id] = {"user_id": user_id, "expires_at": expiry_time}
-        return {"session_id": session_id, "expires_at": expiry_time}
+        session = Session(session_id, user_id, now + self.expiry_minutes * 60, now, data)
+        with self._lock:
+            self._purge_expired(now)
+            if self.max_sessions_per_user:
+                owned = self.user_sessions.get(user_id, {})
+                while len(owned) >= self.max_sessions_per_user:
+                    self._remove(next(iter(owned)))
+            # Fetched after evicting: removing the last session drops the bucket
+            self.user_sessions.setdefault(user_id, {})[session_id] = None
+            self.sessions[session_id] = session
+            self._schedule(session)
+        return {"session_id": session_id, "expires_at": datetime.utcfromtimestamp(session.expires_at)}
 
     def get_session(self, session_id):
         """
@@ -33,12 +91,39 @@ class SessionManager:
         Returns:
             dict: The session data if valid, or None if expired or not found.
         """
-        session = self.sessions.get(session_id)
-        if session and session["expires_at"] > datetime.utcnow():
-            return session
-        # Clean up expired session
-        self.sessions.pop(session_id, None)
-        return None
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            if session.expires_at <= now:
+                self._remove(session_id)
+                return None
+            if self.sliding and now - session.refreshed_at >= self.refresh_interval:
+                session.expires_at = now + self.expiry_minutes * 60
+                session.refreshed_at = now
+                self._schedule(session)
+            return session.to_dict()
+
+    def get_user_sessions(self, user_id):
+        """
+        List a user's live sessions.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            list: Session dicts including their session_id, oldest first.
+        """
+        now = time.time()
+        with self._lock:
+            result = []
+            for session_id in self.user_sessions.get(user_id, ()):
+                session = self.sessions[session_id]
+                if session.expires_at > now:
+                    result.append(dict(session.to_dict(), session_id=session_id))
+            return result
 
     def delete_session(self, session_id):
         """
@@ -50,4 +135,63 @@ class SessionManager:
         Returns:
             bool: True if session was deleted, False otherwise.
         """
-        return self.sessions.pop(session_id, None) is not None
+        with self._lock:
+            return self._remove(session_id)
+
+    def revoke_all(self, user_id):
+        """
+        Delete every session of a user.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: Number of sessions deleted.
+        """
+        with self._lock:
+            session_ids = list(self.user_sessions.get(user_id, ()))
+            for session_id in session_ids:
+                self._remove(session_id)
+            return len(session_ids)
+
+    def count(self):
+        """
+        Returns:
+            int: Number of live sessions.
+        """
+        with self._lock:
+            self._purge_expired(time.time(), limit=None)
+            return len(self.sessions)
+
+    def _schedule(self, session):
+        """Index a session by expiry. Entries superseded by a refresh are skipped later."""
+        heapq.heappush(self._expiry_heap, (session.expires_at, next(self._seq), session.session_id))
+        # Refreshes leave stale entries behind; rebuild before they dominate the heap
+        if len(self._expiry_heap) > 2 * len(self.sessions) + 64:
+            self._expiry_heap = [
+                (s.expires_at, next(self._seq), s.session_id) for s in self.sessions.values()
+            ]
+            heapq.heapify(self._expiry_heap)
+
+    def _purge_expired(self, now, limit=SWEEP_BATCH):
+        """Drop up to limit expired sessions from the front of the heap."""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now and limit != 0:
+            expires_at, _, session_id = heapq.heappop(heap)
+            session = self.sessions.get(session_id)
+            if session is not None and session.expires_at == expires_at:
+                self._remove(session_id)
+                if limit is not None:
+                    limit -= 1
+
+    def _remove(self, session_id):
+        """Unlink a session from both indexes. Caller holds the lock."""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        owned = self.user_sessions.get(session.user_id)
+        if owned is not None:
+            owned.pop(session_id, None)
+            if not owned:
+                del self.user_sessions[session.user_id]
+        return True
@@ -0,0 +1,145 @@
+"""
+OAuthService against a local stub provider.
+Run from python-backend: python -m auth.test_oauth_stub
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from auth import oauth_sevice
+from auth.errors import AuthError
+from auth.oauth_sevice import OAuthService
+
+calls = {"token": 0, "userinfo": 0, "discovery": 0, "jwks": 0, "connections": set()}
+provider = {"id_token": None, "keys": [], "jwks_down": False}
+
+
+class StubProvider(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so reused connections show up
+
+    def _reply(self, status, body, max_age=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if max_age is not None:
+            self.send_header("Cache-Control", f"public, max-age={max_age}")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        calls["token"] += 1
+        body = {"access_token": "stub-token", "token_type": "Bearer"}
+        if provider["id_token"]:
+            body["id_token"] = provider["id_token"]
+        self._reply(200, body)
+
+    def do_GET(self):
+        if self.path == "/.well-known/openid-configuration":
+            calls["discovery"] += 1
+            return self._reply(200, {"issuer": base, "jwks_uri": f"{base}/jwks"}, max_age=3600)
+        if self.path == "/jwks":
+            calls["jwks"] += 1
+            if provider["jwks_down"]:
+                return self._reply(503, {"error": "unavailable"})
+            return self._reply(200, {"keys": provider["keys"]}, max_age=3600)
+        calls["connections"].add(self.client_address)
+        if self.path == "/slow":
+            time.sleep(2)
+            return self._reply(200, {})
+        calls["userinfo"] += 1
+        if calls["userinfo"] == 1:
+            return self._reply(503, {"error": "unavailable"})  # retried
+        self._reply(200, {"id": "42", "email": "stub@example.com"})
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StubProvider)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base = f"http://127.0.0.1:{server.server_port}"
+
+oauth_service = OAuthService({
+    "client_id": "id",
+    "client_secret": "secret",
+    "token_url": f"{base}/token",
+    "user_info_url": f"{base}/userinfo",
+}, timeout=(1, 0.5))
+
+token = oauth_service.exchange_code_for_token("code", "http://localhost/callback")
+print(token["access_token"])  # Output: stub-token
+
+# The first user info call gets a 503 and is retried with backoff
+print(oauth_service.get_user_info(token["access_token"]))  # Output: {'id': '42', 'email': 'stub@example.com'}
+print(calls["userinfo"])  # Output: 2
+
+# Cached under the token digest: no new request
+oauth_service.get_user_info(token["access_token"])
+print(calls["userinfo"])  # Output: 2
+
+# Both user info requests went over one pooled connection
+print(len(calls["connections"]))  # Output: 1
+
+# A provider slower than the read timeout fails fast instead of hanging
+oauth_service.user_info_url = f"{base}/slow"
+oauth_service.session.adapters["http://"].max_retries.total = 0
+start = time.monotonic()
+try:
+    oauth_service.get_user_info("other-token")
+except AuthError:
+    print(f"timed out after {time.monotonic() - start:.1f}s")  # Output: timed out after 0.5s
+
+oauth_service.close()
+
+# OIDC: id_tokens are verified locally with the provider's cached JWKS
+oidc_service = OAuthService({
+    "client_id": "id",
+    "client_secret": "secret",
+    "token_url": f"{base}/token",
+    "user_info_url": f"{base}/userinfo",
+    "issuer": base,
+}, timeout=(1, 0.5))
+
+
+def sign(kid, key):
+    """Publish a key and issue an id_token signed with it."""
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+    provider["keys"].append(dict(jwk, kid=kid, alg="RS256", use="sig"))
+    now = int(time.time())
+    claims = {"iss": base, "aud": "id", "sub": "42", "iat": now, "exp": now + 300, "nonce": "n1"}
+    provider["id_token"] = jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+sign("k1", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+userinfo_calls = calls["userinfo"]
+for _ in range(3):
+    result = oidc_service.authenticate("code", "http://localhost/callback", nonce="n1")
+print(result["user"]["sub"], calls["userinfo"] - userinfo_calls)  # Output: 42 0
+print(calls["discovery"], calls["jwks"])  # Output: 1 1
+
+# A rotated key is unknown to the cached JWKS and triggers one refetch
+oauth_sevice.JWKS_REFETCH_INTERVAL = 0  # normally throttled to one refetch per 30s
+sign("k2", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+print(oidc_service.authenticate("code", "http://localhost/callback")["user"]["sub"])  # Output: 42
+print(calls["jwks"])  # Output: 2
+
+try:
+    oidc_service.authenticate("code", "http://localhost/callback", nonce="other")
+except AuthError as e:
+    print(e)  # Output: AuthError: id_token nonce mismatch
+
+# Keys unavailable (new kid, JWKS endpoint down): user info is used instead,
+# and the user comes back in the same shape as a verified id_token
+provider["jwks_down"] = True
+oidc_service.session.adapters["http://"].max_retries.total = 0
+sign("k3", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+print(oidc_service.authenticate("code", "http://localhost/callback")["user"])  # Output: {'id': '42', 'email': 'stub@example.com', 'sub': '42'}
+
+oidc_service.close()
+server.shutdown()
@@ -13,3 +13,15 @@ print("Admin Delete User Permission:", is_allowed)
 
 permissions = role_manager.get_permissions("user")
 print("User Permissions:", permissions)
+
+# Inheritance and wildcards
+role_manager.register_permissions(["posts:read", "posts:edit", "posts:delete"])
+role_manager.add_role("viewer", ["posts:read"])
+role_manager.add_role("editor", ["posts:edit"], inherits=["viewer"])
+role_manager.add_role("moderator", ["posts:*"], inherits=["user"])
+
+print(role_manager.check_permission("editor", "posts:read"))  # Output: True
+print(role_manager.check_permission("moderator", "posts:archive"))  # Output: True
+print(role_manager.check_all(["editor", "user"], ["posts:edit", "edit_profile"]))  # Output: True
+print(role_manager.check_any("viewer", ["posts:edit", "posts:delete"]))  # Output: False
+print(role_manager.get_permissions("editor"))  # Output: ['posts:read', 'posts:edit']
@@ -0,0 +1,15 @@
+from auth.session_manager import SessionManager
+
+# One session per user: each login replaces the previous one
+session_manager = SessionManager(max_sessions_per_user=1)
+for _ in range(4):
+    latest = session_manager.create_session("u1")
+print(session_manager.count())  # Output: 1
+print([s["session_id"] for s in session_manager.get_user_sessions("u1")] == [latest["session_id"]])  # Output: True
+print(session_manager.revoke_all("u1"), session_manager.count())  # Output: 1 0
+
+# With room for two, the oldest session is the one evicted
+session_manager = SessionManager(max_sessions_per_user=2)
+first, second, third = (session_manager.create_session("u2", {"n": n}) for n in range(3))
+print(session_manager.get_session(first["session_id"]))  # Output: None
+print([s["n"] for s in session_manager.get_user_sessions("u2")])  # Output: [1, 2]
@@ -0,0 +1,189 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+def token_digest(token):
+    """Short digest of a raw token, so cached entries never hold the token itself."""
+    if isinstance(token, str):
+        token = token.encode("utf-8")
+    return hashlib.blake2b(token, digest_size=16).digest()
+
+
+class TokenCache:
+    """Bounded LRU of verified token claims with a jti/sub revocation denylist."""
+
+    def __init__(self, max_entries=10000, retention=3600):
+        """
+        Args:
+            max_entries (int): Verified tokens kept before the least recently
+                used one is dropped.
+            retention (int): Seconds a revocation is remembered when no expiry
+                is given; should cover the longest token lifetime.
+        """
+        self.max_entries = max_entries
+        self.retention = retention
+        self.entries = OrderedDict()  # digest -> (claims, exp)
+        self.by_jti = {}
+        self.by_sub = {}
+        self.revoked_jti = {}  # jti -> forget after
+        self.revoked_sub = {}  # sub -> (revoked at, generation, forget after)
+        # Never purged, so a generation is not handed out twice for one subject
+        self.generations = {}  # sub -> latest generation
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, token):
+        """
+        Return cached claims for a token that is still valid.
+
+        Args:
+            token (str): The raw JWT.
+
+        Returns:
+            dict: A copy of the verified claims, or None on a miss.
+        """
+        digest = token_digest(token)
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, exp = entry
+            if exp <= time.time():
+                self._remove(digest)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, token, claims):
+        """
+        Cache verified claims until the token's exp. Tokens without exp
+        or already revoked are not cached.
+
+        Args:
+            token (str): The raw JWT.
+            claims (dict): Claims returned by a successful verification.
+        """
+        exp = claims.get("exp")
+        if exp is None or self.is_revoked(claims):
+            return
+        digest = token_digest(token)
+        with self.lock:
+            if digest in self.entries:
+                self._remove(digest)
+            self.entries[digest] = (dict(claims), float(exp))
+            if claims.get("jti") is not None:
+                self.by_jti.setdefault(claims["jti"], set()).add(digest)
+            if claims.get("sub") is not None:
+                self.by_sub.setdefault(claims["sub"], set()).add(digest)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, digest):
+        """Drop one entry and its index references. Caller holds the lock."""
+        claims, _ = self.entries.pop(digest)
+        for index, claim in ((self.by_jti, "jti"), (self.by_sub, "sub")):
+            value = claims.get(claim)
+            digests = index.get(value)
+            if digests is not None:
+                digests.discard(digest)
+                if not digests:
+                    del index[value]
+
+    def revoke(self, jti=None, sub=None, expires_at=None):
+        """
+        Deny a token by jti, or every token issued to sub up to now, and
+        drop matching cached entries.
+
+        Args:
+            jti (str): Token id to deny.
+            sub (str): Subject whose current tokens are denied.
+            expires_at (float): Unix time after which the revocation can be
+                forgotten, e.g. the token's exp. Defaults to now + retention.
+        """
+        now = time.time()
+        forget_after = expires_at if expires_at is not None else now + self.retention
+        with self.lock:
+            self._purge_revocations(now)
+            for value, revoked, index in ((jti, self.revoked_jti, self.by_jti),
+                                          (sub, self.revoked_sub, self.by_sub)):
+                if value is None:
+                    continue
+                if revoked is self.revoked_jti:
+                    revoked[value] = forget_after
+                else:
+                    # iat has whole-second resolution: round up so every token
+                    # issued before this moment compares strictly older
+                    generation = self.generations[value] = self.generation(value) + 1
+                    revoked[value] = (math.ceil(now), generation, forget_after)
+                for digest in list(index.get(value, ())):
+                    self._remove(digest)
+
+    def generation(self, sub):
+        """
+        Revocation generation of a subject, embedded by AuthService as the
+        "gen" claim so tokens issued after a revoke are told apart exactly.
+
+        Args:
+            sub (str): Token subject.
+
+        Returns:
+            int: 0 until the subject is first revoked; only ever increases.
+        """
+        return self.generations.get(sub, 0)
+
+    def is_revoked(self, claims):
+        """
+        Check verified claims against the denylist.
+
+        Args:
+            claims (dict): Token claims.
+
+        Returns:
+            bool: True if the token's jti or sub has been revoked.
+        """
+        jti, sub = claims.get("jti"), claims.get("sub")
+        if jti is not None and jti in self.revoked_jti:
+            return True
+        revoked = self.revoked_sub.get(sub) if sub is not None else None
+        if revoked is None:
+            return False
+        # Tokens issued after the revocation (e.g. a fresh login) stay valid
+        if "gen" in claims:
+            return claims["gen"] < revoked[1]
+        return claims.get("iat", 0) < revoked[0]
+
+    def _purge_revocations(self, now):
+        """Forget revocations that outlived every token they covered."""
+        for jti in [j for j, until in self.revoked_jti.items() if until <= now]:
+            del self.revoked_jti[jti]
+        for sub in [s for s, (_, _, until) in self.revoked_sub.items() if until <= now]:
+            del self.revoked_sub[sub]
+
+    def clear(self):
+        """Drop every cached entry; revocations are kept."""
+        with self.lock:
+            self.entries.clear()
+            self.by_jti.clear()
+            self.by_sub.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Size, hits, misses and hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "revoked_jti": len(self.revoked_jti),
+            "revoked_sub": len(self.revoked_sub),
+        }
@@ -1,6 +1,8 @@
 import re
 
+EMAIL_PATTERN = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+
+
 def validate_email(email):
     """Validate email format."""
-    pattern = r"^[\w\.-]+@[\w\.-]+\.\w+$"
-    return re.match(pattern, email) is not None
+    return isinstance(email, str) and EMAIL_PATTERN.match(email) is not None
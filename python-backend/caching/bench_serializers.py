@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Payload size and encode/decode time per RedisClient codec
+"""
+import time
+
+from cache.serializers import SERIALIZERS, ValueCodec
+
+ROUNDS = 2_000
+
+SAMPLE = {
+    "user": {"id": 123, "name": "john_doe", "roles": ["admin", "editor"]},
+    "items": [
+        {"sku": f"SKU-{i:05d}", "price": i * 1.25, "tags": ["new", "sale"], "stock": i % 17}
+        for i in range(200)
+    ],
+    "flags": {"beta": True, "dark_mode": False},
+}
+
+
+def timed(fn, arg):
+    """Average microseconds per call over ROUNDS calls."""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(arg)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'codec':<10} {'zlib':<5} {'bytes':>8} {'encode us':>10} {'decode us':>10}")
+    for name in SERIALIZERS:
+        for threshold in (None, 1024):
+            try:
+                codec = ValueCodec(name, compress_threshold=threshold)
+            except ImportError:
+                print(f"{name:<10} not installed")
+                break
+            payload = codec.encode(SAMPLE)
+            print(
+                f"{name:<10} {'yes' if threshold else 'no':<5} {len(payload):>8} "
+                f"{timed(codec.encode, SAMPLE):>10.1f} {timed(codec.decode, payload):>10.1f}"
+            )
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark: MemoryCache vs ShardedMemoryCache
+"""
+import time
+from threading import Barrier, Thread
+
+from cache.memory_cache import MemoryCache
+from cache.sharded_cache import ShardedMemoryCache
+
+OPS_PER_THREAD = 50_000
+KEYSPACE = 10_000
+
+
+def worker(cache, barrier, offset):
+    """Mixed 80/20 read/write load on a shared keyspace."""
+    barrier.wait()
+    for i in range(OPS_PER_THREAD):
+        key = (i * 7 + offset) % KEYSPACE
+        if i % 5 == 0:
+            cache.set(key, i, ttl=60)
+        else:
+            cache.get(key)
+
+
+def run(cache, threads):
+    """Return operations per second for `threads` concurrent workers."""
+    barrier = Barrier(threads + 1)
+    pool = [Thread(target=worker, args=(cache, barrier, n)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    return threads * OPS_PER_THREAD / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    print(f"{'threads':>7} {'MemoryCache':>14} {'Sharded(16)':>14}")
+    for threads in (1, 4, 16):
+        single = run(MemoryCache(max_entries=KEYSPACE), threads)
+        sharded = run(ShardedMemoryCache(shards=16, max_entries=KEYSPACE), threads)
+        print(f"{threads:>7} {single:>12,.0f}/s {sharded:>12,.0f}/s")
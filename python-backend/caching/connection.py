@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+""" shared, lazily created redis connection pools """
+
+import os
+from os import getenv
+from threading import Lock
+from typing import Dict, Optional, Tuple
+from weakref import WeakSet
+
+import redis
+
+# Applied to pools created after configure(); existing pools keep theirs
+_settings = {
+    "max_connections": int(getenv("REDIS_MAX_CONNECTIONS", 50)),
+    "timeout": float(getenv("REDIS_POOL_TIMEOUT", 5)),
+    "health_check_interval": int(getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)),
+    "socket_timeout": float(getenv("REDIS_SOCKET_TIMEOUT", 5)),
+    "socket_connect_timeout": float(getenv("REDIS_CONNECT_TIMEOUT", 2)),
+}
+
+PoolKey = Tuple[str, int, int]
+
+_pools: Dict[PoolKey, redis.ConnectionPool] = {}
+_clients: Dict[PoolKey, redis.Redis] = {}
+_resources = WeakSet()  # objects with close()/reset() living on top of the pools
+_lock = Lock()
+
+
+def configure(**settings) -> None:
+    """
+    Change pool settings: max_connections, timeout (seconds to wait
+    for a free connection), health_check_interval, socket_timeout and
+    socket_connect_timeout.
+    """
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown pool settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        _settings.update(settings)
+
+
+def _key(host: Optional[str], port: Optional[int], db: Optional[int]) -> PoolKey:
+    """ Registry key, filling unset parts from the environment """
+    return (
+        host or getenv("REDIS_HOST", "localhost"),
+        int(port if port is not None else getenv("REDIS_PORT", 6379)),
+        int(db if db is not None else getenv("REDIS_DB", 0)),
+    )
+
+
+def get_pool(host: Optional[str] = None, port: Optional[int] = None,
+             db: Optional[int] = None) -> redis.ConnectionPool:
+    """
+    The shared pool for host/port/db, created on first use.
+    Connections themselves are opened on the first command.
+    """
+    key = _key(host, port, db)
+    pool = _pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = redis.BlockingConnectionPool(
+                    host=key[0], port=key[1], db=key[2], **_settings
+                )
+    return pool
+
+
+def get_redis(host: Optional[str] = None, port: Optional[int] = None,
+              db: Optional[int] = None) -> redis.Redis:
+    """ A client bound to the shared pool for host/port/db """
+    key = _key(host, port, db)
+    client = _clients.get(key)
+    if client is None:
+        pool = get_pool(*key)
+        with _lock:
+            client = _clients.setdefault(key, redis.StrictRedis(connection_pool=pool))
+    return client
+
+
+def register(resource) -> None:
+    """
+    Tie a resource built on the pools, e.g. a ShardedRedis with its
+    thread pool, to them: close_all() calls its close() and forked
+    children call its reset().
+    """
+    with _lock:
+        _resources.add(resource)
+
+
+def reset() -> None:
+    """
+    Forget every pool. Runs automatically in forked children so
+    pre-fork servers never share sockets with their parent; the
+    inherited pools are dropped without touching the parent's
+    connections, and registered resources drop their threads.
+    """
+    global _lock
+    _lock = Lock()  # the parent may have held it while forking
+    _pools.clear()
+    _clients.clear()
+    for resource in list(_resources):
+        resource.reset()
+
+
+def close_all() -> None:
+    """ Close registered resources, then disconnect and forget every pool """
+    with _lock:
+        pools = list(_pools.values())
+        resources = list(_resources)
+    for resource in resources:
+        resource.close()
+    for pool in pools:
+        pool.disconnect()
+    reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset)
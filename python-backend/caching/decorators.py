@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+""" general purpose caching decorator """
+
+import hashlib
+import inspect
+import json
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple, Type
+
+from .memory_cache import MemoryCache
+
+# Cached entries are wrapped so a cached None or error is not mistaken for a miss
+VALUE, NONE, ERROR = "v", "n", "e"
+
+
+def _type_name(cls: type) -> str:
+    """ module.qualname of a class """
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def encode_arg(value: Any) -> Any:
+    """
+    JSON-ready form of an argument, tagged with its type so (1, 2) and
+    [1, 2], or 1 and True, get different keys. Objects other than
+    builtins must define __cache_key__() returning a stable identity;
+    anything else is refused rather than keyed by an address repr.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (bool, int)):
+        return [type(value).__name__, value]
+    if isinstance(value, float):
+        return ["float", repr(value)]
+    if isinstance(value, bytes):
+        return ["bytes", value.hex()]
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [encode_arg(item) for item in value]]
+    if isinstance(value, (set, frozenset)):
+        items = [encode_arg(item) for item in value]
+        return [type(value).__name__, sorted(items, key=json.dumps)]
+    if isinstance(value, dict):
+        items = [[encode_arg(k), encode_arg(v)] for k, v in value.items()]
+        return ["dict", sorted(items, key=json.dumps)]
+    hook = getattr(value, "__cache_key__", None)
+    if hook is not None:
+        return [_type_name(type(value)), encode_arg(hook())]
+    raise TypeError(
+        f"Cannot build a cache key from a {_type_name(type(value))} argument; "
+        "define __cache_key__() on it or pass key= to @cached"
+    )
+
+
+def make_key(fn: Callable, args: tuple, kwargs: dict, prefix: str = "cached",
+             signature: Optional[inspect.Signature] = None) -> str:
+    """
+    Build a stable hashed key for a call.
+    Arguments are bound to the signature first, so f(1, b=2) and f(1, 2)
+    share a key, then encoded with encode_arg. For methods, self needs a
+    __cache_key__() hook, or the decorator needs key=.
+    """
+    try:
+        bound = (signature or inspect.signature(fn)).bind(*args, **kwargs)
+        bound.apply_defaults()
+        args, kwargs = bound.args, bound.kwargs
+    except (TypeError, ValueError):
+        pass
+    payload = json.dumps([encode_arg(args), encode_arg(kwargs)], separators=(",", ":"))
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{prefix}:{fn.__module__}.{fn.__qualname__}:{digest}"
+
+
+def cached(ttl: Optional[int] = 60, backend: Any = None, key: Optional[Callable] = None,
+           negative_ttl: Optional[int] = None,
+           negative_exceptions: Tuple[Type[BaseException], ...] = (),
+           prefix: str = "cached") -> Callable:
+    """
+    Cache a function's results.
+
+    Works on plain functions, methods and coroutine functions; sync and
+    async callers share one key scheme. Pass `bypass_cache=True` to a
+    decorated call to skip the cache for that call.
+
+    The default key includes every argument, `self` too, and an
+    ordinary object has no stable identity to key by: calling a
+    decorated method raises TypeError unless its class defines
+    __cache_key__() or the decorator is given key=.
+
+        class Users:
+            def __init__(self, db):
+                self.db = db
+
+            def __cache_key__(self):
+                return self.db.name
+
+            @cached(ttl=30)
+            def get(self, user_id): ...
+
+            @cached(ttl=30, key=lambda self, user_id: f"users:{user_id}")
+            def profile(self, user_id): ...
+
+    :param ttl: Seconds a result stays cached.
+    :param backend: Any cache with get/set(key, value, ttl)/delete, such as
+        MemoryCache, RedisClient, TieredCache or AsyncRedisClient.
+        Defaults to a private MemoryCache.
+    :param key: Callable building the key from the call's arguments;
+        defaults to a hash of the type-tagged bound arguments, which
+        refuses objects without a __cache_key__() hook.
+    :param negative_ttl: Seconds to cache a None result or one of
+        `negative_exceptions`; None disables negative caching.
+    :param negative_exceptions: Exception types to cache and replay.
+    :param prefix: Key namespace.
+    :return: Decorator.
+    """
+    store = backend if backend is not None else MemoryCache(max_entries=1024, name="cached")
+    errors = {_type_name(exc): exc for exc in negative_exceptions}
+
+    def decorator(fn: Callable) -> Callable:
+        """ Decorator """
+        try:
+            signature = inspect.signature(fn)
+        except (TypeError, ValueError):
+            signature = None
+
+        def build_key(args, kwargs):
+            """ Key for one call """
+            if key is not None:
+                return f"{prefix}:{key(*args, **kwargs)}"
+            return make_key(fn, args, kwargs, prefix, signature)
+
+        def unwrap(entry):
+            """ Turn a stored entry back into a result, or raise """
+            if entry[0] == VALUE:
+                return entry[1]
+            if entry[0] == NONE:
+                return None
+            raise errors[entry[1]](*entry[2])
+
+        def is_hit(entry):
+            """ A stored entry that can still be replayed """
+            return entry is not None and (entry[0] != ERROR or entry[1] in errors)
+
+        def record(result=None, exc=None):
+            """ Entry and TTL to store for an outcome, or (None, None) """
+            if exc is not None:
+                if negative_ttl is None:
+                    return None, None
+                return [ERROR, _type_name(type(exc)), list(exc.args)], negative_ttl
+            if result is None:
+                return ([NONE], negative_ttl) if negative_ttl is not None else (None, None)
+            return [VALUE, result], ttl
+
+        if inspect.iscoroutinefunction(fn):
+            async def maybe_await(value):
+                """ Support sync and async backends alike """
+                return await value if inspect.isawaitable(value) else value
+
+            async def save(cache_key, entry, entry_ttl):
+                """ Store an entry if there is one """
+                if entry is not None:
+                    await maybe_await(store.set(cache_key, entry, entry_ttl))
+
+            @wraps(fn)
+            async def async_wrapper(*args, bypass_cache=False, **kwargs):
+                """ Async cached call """
+                if bypass_cache:
+                    return await fn(*args, **kwargs)
+                cache_key = build_key(args, kwargs)
+                entry = await maybe_await(store.get(cache_key))
+                if is_hit(entry):
+                    return unwrap(entry)
+                try:
+                    result = await fn(*args, **kwargs)
+                except negative_exceptions as exc:
+                    await save(cache_key, *record(exc=exc))
+                    raise
+                await save(cache_key, *record(result))
+                return result
+
+            async def async_invalidate(*args, **kwargs):
+                """ Drop the cached result of one call """
+                await maybe_await(store.delete(build_key(args, kwargs)))
+
+            async_wrapper.cache_key = lambda *a, **kw: build_key(a, kw)
+            async_wrapper.invalidate = async_invalidate
+            return async_wrapper
+
+        def save(cache_key, entry, entry_ttl):
+            """ Store an entry if there is one """
+            if entry is not None:
+                store.set(cache_key, entry, entry_ttl)
+
+        @wraps(fn)
+        def wrapper(*args, bypass_cache=False, **kwargs):
+            """ Cached call """
+            if bypass_cache:
+                return fn(*args, **kwargs)
+            cache_key = build_key(args, kwargs)
+            entry = store.get(cache_key)
+            if is_hit(entry):
+                return unwrap(entry)
+            try:
+                result = fn(*args, **kwargs)
+            except negative_exceptions as exc:
+                save(cache_key, *record(exc=exc))
+                raise
+            save(cache_key, *record(result))
+            return result
+
+        def invalidate(*args, **kwargs):
+            """ Drop the cached result of one call """
+            store.delete(build_key(args, kwargs))
+
+        wrapper.cache_key = lambda *a, **kw: build_key(a, kw)
+        wrapper.invalidate = invalidate
+        return wrapper
+
+    return decorator
@@ -2,23 +2,148 @@
 """
 Redis module
 """
+import atexit
+import os
 import sys
+import time
+from collections import defaultdict
 from functools import wraps
-from typing import Union, Optional, Callable
+from threading import Event, Lock, Thread
+from typing import Union, Optional, Callable, Dict, List
 from uuid import uuid4
 
 import redis
 
+from .connection import get_redis
+
 UnionOfTypes = Union[str, bytes, int, float]
 
 
-def count_calls(method: Callable) -> Callable:
+class CallMetricsBuffer:
+    """
+    Aggregates call counts and call history in process and writes
+    them to redis in a single pipeline every `flush_every` calls or
+    `flush_interval` seconds, whichever comes first. A daemon thread,
+    started on the first buffered event, flushes on the interval even
+    when no further calls arrive.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None,
+                 flush_interval: float = 1.0, flush_every: int = 100,
+                 max_history: Optional[int] = 1000):
+        """
+        :param client: redis client to flush to; defaults to the
+            shared get_redis() client, resolved at each flush
+        :param flush_interval: seconds between flushes
+        :param flush_every: number of buffered events forcing a flush
+        :param max_history: length each history list is trimmed to
+        """
+        self.client = client
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.max_history = max_history
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._history: Dict[str, List[str]] = defaultdict(list)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = Lock()
+        self._stop = Event()
+        self._flusher_pid: Optional[int] = None
+        atexit.register(self.close)
+
+    def incr(self, key: str) -> None:
+        """buffer one increment of a counter"""
+        with self._lock:
+            self._counts[key] += 1
+            self._pending += 1
+        self._maybe_flush()
+
+    def push(self, key: str, value: str) -> None:
+        """buffer one entry appended to a history list"""
+        with self._lock:
+            self._history[key].append(value)
+            self._pending += 1
+        self._maybe_flush()
+
+    def _start_flusher(self) -> None:
+        """start the interval thread, again in a forked child"""
+        with self._lock:
+            if self._flusher_pid == os.getpid() or self._stop.is_set():
+                return
+            self._flusher_pid = os.getpid()
+        Thread(target=self._run_flusher, name="call-metrics-flush",
+               daemon=True).start()
+
+    def _run_flusher(self) -> None:
+        """flush every flush_interval until closed"""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except redis.RedisError:
+                pass  # metrics are best effort; keep flushing later batches
+
+    def close(self) -> None:
+        """stop the interval thread and write what is buffered"""
+        self._stop.set()
+        self.flush()
+
+    def _maybe_flush(self) -> None:
+        """flush if enough events or time have accumulated"""
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+        if (self._pending >= self.flush_every or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """write every buffered count and history entry in one pipeline"""
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+            history, self._history = self._history, defaultdict(list)
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        if not (counts or history):
+            return
+        client = self.client if self.client is not None else get_redis()
+        pipe = client.pipeline(transaction=False)
+        for key, amount in counts.items():
+            pipe.incrby(key, amount)
+        for key, values in history.items():
+            if self.max_history:
+                values = values[-self.max_history:]
+            pipe.rpush(key, *values)
+            if self.max_history:
+                pipe.ltrim(key, -self.max_history, -1)
+        pipe.execute()
+
+
+def _client_for(instance, client: Optional[redis.Redis]) -> redis.Redis:
+    """
+    explicit client, else the `_redis` of the decorated method's owner,
+    else the shared get_redis() client
+    """
+    if client is not None:
+        return client
+    owned = getattr(instance, "_redis", None)
+    return owned if owned is not None else get_redis()
+
+
+def count_calls(method: Optional[Callable] = None, *,
+                client: Optional[redis.Redis] = None,
+                buffer: Optional[CallMetricsBuffer] = None) -> Callable:
     """
     a system to count how many
-    times methods of the Cache class are called.
+    times methods of any class are called.
+    Usable bare (@count_calls) or with options
+    (@count_calls(buffer=CallMetricsBuffer())).
     :param method:
+    :param client: redis client, defaults to the instance's `_redis`,
+        then get_redis(); a buffer writes to its own client instead
+    :param buffer: aggregate counts in process and flush in batches
     :return:
     """
+    if method is None:
+        return lambda m: count_calls(m, client=client, buffer=buffer)
     key = method.__qualname__
 
     @wraps(method)
@@ -30,29 +155,57 @@ def count_calls(method: Callable) -> Callable:
         :param kwargs:
         :return:
         """
-        self._redis.incr(key)
+        if buffer is not None:
+            buffer.incr(key)
+        else:
+            _client_for(self, client).incr(key)
         return method(self, *args, **kwargs)
 
     return wrapper
 
 
-def call_history(method: Callable) -> Callable:
+def call_history(method: Optional[Callable] = None, *,
+                 client: Optional[redis.Redis] = None,
+                 buffer: Optional[CallMetricsBuffer] = None,
+                 max_history: Optional[int] = 1000) -> Callable:
     """
     add its input parameters to one list
     in redis, and store its output into another list.
+    Lists are trimmed to the newest `max_history` entries.
     :param method:
+    :param client: redis client, defaults to the instance's `_redis`,
+        then get_redis(); a buffer writes to its own client instead
+    :param buffer: aggregate history in process and flush in batches
+    :param max_history: cap of each list when not buffered
     :return:
     """
+    if method is None:
+        return lambda m: call_history(m, client=client, buffer=buffer,
+                                      max_history=max_history)
     key = method.__qualname__
     i = "".join([key, ":inputs"])
     o = "".join([key, ":outputs"])
 
+    def append(redis_client: redis.Redis, list_key: str, value: str) -> None:
+        """push and trim in one round trip"""
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.rpush(list_key, value)
+        if max_history:
+            pipe.ltrim(list_key, -max_history, -1)
+        pipe.execute()
+
     @wraps(method)
     def wrapper(self, *args, **kwargs):
         """ Wrapp """
-        self._redis.rpush(i, str(args))
+        if buffer is not None:
+            buffer.push(i, str(args))
+        else:
+            append(_client_for(self, client), i, str(args))
         res = method(self, *args, **kwargs)
-        self._redis.rpush(o, str(res))
+        if buffer is not None:
+            buffer.push(o, str(res))
+        else:
+            append(_client_for(self, client), o, str(res))
         return res
 
     return wrapper
@@ -67,7 +220,7 @@ class Cache:
         """
         constructor of the redis model
         """
-        self._redis = redis.Redis()
+        self._redis = get_redis()
         self._redis.flushdb()
 
     @count_calls
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+""" cache instrumentation: counters, histograms and size gauges """
+
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import getenv
+from threading import Lock, Thread, current_thread, local
+from typing import Dict, Optional
+from weakref import WeakSet
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+COUNTERS = ("hits", "misses", "evictions", "expirations", "errors")
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """ Fixed-bucket histogram, cumulative only when rendered """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """ Record one observation """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        """ Cumulative bucket counts keyed by upper bound """
+        cumulative, running = {}, 0
+        for bound, hits in zip(self.buckets + (float("inf"),), self.counts):
+            running += hits
+            cumulative[bound] = running
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class _Timer:
+    """ Context manager feeding one latency histogram """
+
+    __slots__ = ("metrics", "op", "start")
+
+    def __init__(self, metrics: "CacheMetrics", op: str):
+        self.metrics = metrics
+        self.op = op
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.op, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.error()
+        return False
+
+
+class _ThreadMetrics:
+    """ One thread's share of a backend's metrics, written without locks """
+
+    __slots__ = ("counters", "latency", "value_size")
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.latency: Dict[str, Histogram] = {}
+        self.value_size = Histogram(SIZE_BUCKETS)
+
+    def add(self, other: "_ThreadMetrics") -> None:
+        """ Fold another part's counts into this one """
+        for name, value in list(other.counters.items()):
+            self.counters[name] = self.counters.get(name, 0) + value
+        for op, histogram in list(other.latency.items()):
+            _merge(self.latency.setdefault(op, Histogram(LATENCY_BUCKETS)), histogram)
+        _merge(self.value_size, other.value_size)
+
+
+def _merge(target: Histogram, source: Histogram) -> None:
+    """ Add one histogram's observations into another """
+    for i, hits in enumerate(source.counts):
+        target.counts[i] += hits
+    target.sum += source.sum
+    target.count += source.count
+
+
+class CacheMetrics:
+    """
+    Everything one cache backend reports. Each thread records into its
+    own counters, summed when a snapshot is taken, so instrumenting a
+    lock-striped cache adds no shared lock to its hot path. Parts of
+    threads that have ended are folded into one retired total, so
+    thread-per-task code does not grow the list without bound.
+    """
+
+    def __init__(self, backend: str, registry: "MetricsRegistry"):
+        self.backend = backend
+        self.registry = registry
+        # Caches whose stats() feed the entries/bytes gauges
+        self.tracked = WeakSet()
+        self._local = local()
+        self._parts: Dict[Thread, _ThreadMetrics] = {}
+        self._retired = _ThreadMetrics()  # sum of ended threads' parts
+        self._lock = Lock()  # only taken when a thread first records, and by snapshots
+
+    def _part(self) -> _ThreadMetrics:
+        """ The calling thread's metrics """
+        part = getattr(self._local, "part", None)
+        if part is None:
+            part = self._local.part = _ThreadMetrics()
+            with self._lock:
+                self._retire_dead()
+                self._parts[current_thread()] = part
+        return part
+
+    def _retire_dead(self) -> None:
+        """
+        Fold the parts of ended threads into the retired total; they can
+        no longer write, so no lock is needed on their side. Caller
+        holds the lock.
+        """
+        for thread in [t for t in self._parts if not t.is_alive()]:
+            self._retired.add(self._parts.pop(thread))
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """ Bump a counter """
+        if not self.registry.enabled:
+            return
+        counters = self._part().counters
+        counters[name] = counters.get(name, 0) + amount
+
+    def hit(self) -> None:
+        """ Count a cache hit """
+        self.incr("hits")
+
+    def miss(self) -> None:
+        """ Count a cache miss """
+        self.incr("misses")
+
+    def eviction(self, amount: int = 1) -> None:
+        """ Count evicted entries """
+        self.incr("evictions", amount)
+
+    def expiration(self, amount: int = 1) -> None:
+        """ Count expired entries """
+        self.incr("expirations", amount)
+
+    def error(self) -> None:
+        """ Count a backend error """
+        self.incr("errors")
+
+    def observe(self, op: str, seconds: float) -> None:
+        """ Record the latency of one operation """
+        if not self.registry.enabled:
+            return
+        latency = self._part().latency
+        histogram = latency.get(op)
+        if histogram is None:
+            histogram = latency[op] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def observe_size(self, nbytes: int) -> None:
+        """ Record the size of a stored value """
+        if not self.registry.enabled:
+            return
+        self._part().value_size.observe(nbytes)
+
+    def timer(self, op: str):
+        """
+        Time a block and count an error if an exception escapes it;
+        a shared no-op when instrumentation is off
+        """
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, op)
+
+    def reset(self) -> None:
+        """ Zero counters and histograms """
+        with self._lock:
+            self._retired = _ThreadMetrics()
+            for part in self._parts.values():
+                part.counters = dict.fromkeys(COUNTERS, 0)
+                part.latency = {}
+                part.value_size = Histogram(SIZE_BUCKETS)
+
+    def track(self, cache) -> None:
+        """ Include a cache's stats() entries/bytes in the size gauges """
+        self.tracked.add(cache)
+
+    def snapshot(self) -> dict:
+        """ Plain-dict copy of every metric, summed over threads """
+        total = _ThreadMetrics()
+        with self._lock:
+            self._retire_dead()
+            total.add(self._retired)
+            parts = list(self._parts.values())
+        for part in parts:
+            total.add(part)
+        counters, latency, value_size = total.counters, total.latency, total.value_size
+        gauges = {"entries": 0, "bytes": 0}
+        for cache in list(self.tracked):
+            stats = cache.stats()
+            gauges["entries"] += stats.get("entries", 0)
+            gauges["bytes"] += stats.get("bytes", 0)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = counters["hits"] / lookups if lookups else 0.0
+        return {"counters": counters, "gauges": gauges,
+                "latency": {op: h.snapshot() for op, h in latency.items()},
+                "value_size": value_size.snapshot()}
+
+
+class MetricsRegistry:
+    """ All backends' metrics, keyed by backend name """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._backends: Dict[str, CacheMetrics] = {}
+        self._lock = Lock()
+
+    def get(self, backend: str) -> CacheMetrics:
+        """ Metrics of a backend, created on first use """
+        metrics = self._backends.get(backend)
+        if metrics is None:
+            with self._lock:
+                metrics = self._backends.setdefault(backend, CacheMetrics(backend, self))
+        return metrics
+
+    def snapshot(self) -> dict:
+        """ Stats snapshot of every backend """
+        return {name: m.snapshot() for name, m in list(self._backends.items())}
+
+    def render_prometheus(self) -> str:
+        """ Prometheus text exposition format """
+        lines = []
+        snapshots = self.snapshot()
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for counter in COUNTERS:
+            family(f"cache_{counter}_total", "counter", f"Cache {counter}.")
+            for backend, snap in snapshots.items():
+                lines.append(f'cache_{counter}_total{{backend="{backend}"}} '
+                             f'{snap["counters"].get(counter, 0)}')
+        for gauge in ("entries", "bytes"):
+            family(f"cache_{gauge}", "gauge", f"Cached {gauge} held in process.")
+            for backend, snap in snapshots.items():
+                lines.append(f'cache_{gauge}{{backend="{backend}"}} {snap["gauges"][gauge]}')
+
+        family("cache_operation_seconds", "histogram", "Cache operation latency.")
+        for backend, snap in snapshots.items():
+            for op, hist in snap["latency"].items():
+                _render_histogram(lines, "cache_operation_seconds",
+                                  f'backend="{backend}",op="{op}"', hist)
+        family("cache_value_bytes", "histogram", "Size of values written to the cache.")
+        for backend, snap in snapshots.items():
+            _render_histogram(lines, "cache_value_bytes",
+                              f'backend="{backend}"', snap["value_size"])
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """ Zero every recorded metric; backends keep their handles """
+        for metrics in list(self._backends.values()):
+            metrics.reset()
+
+
+def _render_histogram(lines: list, name: str, labels: str, hist: dict) -> None:
+    """ Append the bucket/sum/count series of one histogram """
+    for bound, cumulative in hist["buckets"].items():
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {hist['sum']}")
+    lines.append(f"{name}_count{{{labels}}} {hist['count']}")
+
+
+registry = MetricsRegistry(enabled=getenv("CACHE_METRICS", "1") not in ("0", "false", "no"))
+
+
+def get_metrics(backend: str) -> CacheMetrics:
+    """ Metrics handle of a backend in the default registry """
+    return registry.get(backend)
+
+
+def record_lookup(metrics: CacheMetrics, value: Optional[object]) -> None:
+    """ Count a lookup result as a hit or a miss """
+    if value is None:
+        metrics.miss()
+    else:
+        metrics.hit()
+
+
+def snapshot() -> dict:
+    """ Stats snapshot of the default registry """
+    return registry.snapshot()
+
+
+def render_prometheus() -> str:
+    """ Prometheus text of the default registry """
+    return registry.render_prometheus()
+
+
+def enable() -> None:
+    """ Turn instrumentation on """
+    registry.enabled = True
+
+
+def disable() -> None:
+    """ Turn instrumentation off; hooks return immediately """
+    registry.enabled = False
+
+
+def serve_metrics(port: int = 9100, addr: str = "") -> ThreadingHTTPServer:
+    """ Serve render_prometheus() at /metrics from a daemon thread """
+
+    class Handler(BaseHTTPRequestHandler):
+        """ /metrics handler """
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    Thread(target=server.serve_forever, name="cache-metrics", daemon=True).start()
+    return server
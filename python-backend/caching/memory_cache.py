@@ -1,13 +1,83 @@
+import atexit
+import heapq
+import sys
 import time
-from threading import RLock
+from collections import OrderedDict
+from itertools import count as counter
+from threading import Event, RLock, Thread
+from .instrumentation import get_metrics
+from .snapshot import SnapshotReader, write_snapshot
+
+EVICTION_POLICIES = ("lru", "lfu")
+# Expired entries dropped per write, so a write never stalls on a big backlog
+SWEEP_BATCH = 16
+
+
+def estimate_size(key, value):
+    """
+    Approximate the memory held by a cache entry.
+    Containers are measured one level deep, which is enough to keep a
+    byte budget honest without walking arbitrarily nested values.
+    :param key: The entry key.
+    :param value: The entry value.
+    :return: Approximate size in bytes.
+    """
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += sys.getsizeof(k) + sys.getsizeof(v)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += sys.getsizeof(item)
+    return size
+
+
+class _Entry:
+    """A cached value and its bookkeeping."""
+
+    __slots__ = ("value", "expiry", "size", "freq")
+
+    def __init__(self, value, expiry, size):
+        self.value = value
+        self.expiry = expiry
+        self.size = size
+        self.freq = 1
 
 
 class MemoryCache:
     """A thread-safe in-memory cache manager."""
 
-    def __init__(self):
-        self.store = {}  # Dictionary to hold cached data
+    def __init__(self, max_entries=None, max_bytes=None, policy="lru", name="memory"):
+        """
+        :param max_entries: Maximum number of entries kept (optional).
+        :param max_bytes: Approximate memory budget in bytes (optional).
+        :param policy: Eviction policy, "lru" or "lfu".
+        :param name: Backend name this cache reports metrics under.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unsupported eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        # Insertion order doubles as recency order for LRU
+        self.store = OrderedDict()
+        # LFU keeps one recency-ordered bucket of keys per access frequency
+        self._freq_buckets = {}
+        self._min_freq = 0
+        # Min-heap of (expiry, seq, key); stale items are skipped lazily
+        self._expiry_heap = []
+        self._seq = counter()
+        self._sweeper = None
+        self._sweeper_stop = Event()
+        # Lazily loaded snapshot, and keys it must no longer answer for
+        self._snapshot = None
+        self._shadowed = set()
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
         self.lock = RLock()  # Ensure thread-safe access to the store
+        self.metrics = get_metrics(name)
+        self.metrics.track(self)
 
     def set(self, key, value, ttl=None):
         """
@@ -16,9 +86,30 @@ class MemoryCache:
         :param value: The value to store.
         :param ttl: Time-to-live in seconds (optional).
         """
-        with self.lock:
-            expiry_time = time.time() + ttl if ttl else None
-            self.store[key] = {"value": value, "expiry": expiry_time}
+        with self.lock, self.metrics.timer("set"):
+            now = time.time()
+            self._purge_expired(now, SWEEP_BATCH)
+            expiry_time = now + ttl if ttl else None
+            size = estimate_size(key, value)
+            if self._snapshot is not None:
+                self._shadowed.add(key)
+            if key in self.store:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Could never fit; storing it would flush the whole cache
+                self.evictions += 1
+                self.metrics.eviction()
+                return
+            self._make_room(size)
+            self.metrics.observe_size(size)
+            self.store[key] = _Entry(value, expiry_time, size)
+            self.bytes += size
+            if self.policy == "lfu":
+                self._freq_buckets.setdefault(1, OrderedDict())[key] = None
+                self._min_freq = 1
+            if expiry_time is not None:
+                heapq.heappush(self._expiry_heap, (expiry_time, next(self._seq), key))
+                self._compact_heap()
 
     def get(self, key):
         """
@@ -26,32 +117,302 @@ class MemoryCache:
         :param key: The key to retrieve.
         :return: The value if the key exists and is not expired, else None.
         """
-        with self.lock:
-            if key in self.store:
-                entry = self.store[key]
-                if entry["expiry"] is None or entry["expiry"] > time.time():
-                    return entry["value"]
-                else:
-                    # Remove expired entry
-                    del self.store[key]
-        return None
+        with self.lock, self.metrics.timer("get"):
+            entry = self.store.get(key)
+            if entry is None:
+                if self._snapshot is not None:
+                    return self._promote(key)
+                self.metrics.miss()
+                return None
+            if entry.expiry is not None and entry.expiry <= time.time():
+                # Remove expired entry
+                self._remove(key)
+                self.expirations += 1
+                self.metrics.expiration()
+                self.metrics.miss()
+                return None
+            self._touch(key, entry)
+            self.metrics.hit()
+            return entry.value
 
     def delete(self, key):
         """
         Delete a key-value pair from the cache.
         :param key: The key to delete.
         """
-        with self.lock:
+        with self.lock, self.metrics.timer("delete"):
+            if self._snapshot is not None:
+                self._shadowed.add(key)
             if key in self.store:
-                del self.store[key]
+                self._remove(key)
+
+    def get_many(self, keys):
+        """
+        Retrieve several keys under a single lock acquisition.
+        :param keys: The keys to retrieve.
+        :return: Dictionary of the keys that exist and are not expired.
+        """
+        result = {}
+        with self.lock:
+            for key in keys:
+                value = self.get(key)
+                if value is not None:
+                    result[key] = value
+        return result
+
+    def set_many(self, mapping, ttl=None):
+        """
+        Store several key-value pairs under a single lock acquisition.
+        :param mapping: Dictionary of keys and values to store.
+        :param ttl: One TTL for every key, or a dictionary of per-key TTLs (optional).
+        """
+        with self.lock:
+            for key, value in mapping.items():
+                self.set(key, value, ttl.get(key) if isinstance(ttl, dict) else ttl)
+
+    def delete_many(self, keys):
+        """
+        Delete several keys under a single lock acquisition.
+        :param keys: The keys to delete.
+        """
+        with self.lock:
+            for key in keys:
+                self.delete(key)
 
     def clear(self):
         """
         Clear all entries from the cache.
         """
         with self.lock:
+            self._detach_snapshot()
             self.store.clear()
+            self._freq_buckets.clear()
+            self._expiry_heap.clear()
+            self._min_freq = 0
+            self.bytes = 0
 
     def count(self):
         """
-        Count the
+        Count the number of live entries in the cache.
+        Expired entries are popped off the expiry heap first, so the
+        cost is proportional to what expired, not to the cache size.
+        Entries still waiting in a lazily loaded snapshot are not counted.
+        :return: Number of unexpired entries.
+        """
+        with self.lock:
+            self._purge_expired(time.time())
+            return len(self.store)
+
+    def dump_snapshot(self, path):
+        """
+        Write the live entries and their expiry times to a binary snapshot.
+        Entries of a lazily loaded snapshot that were never read are kept.
+        :param path: Destination file, replaced atomically.
+        :return: Number of entries written.
+        """
+        with self.lock:
+            now = time.time()
+            self._purge_expired(now)
+            entries = [(key, entry.value, entry.expiry) for key, entry in self.store.items()]
+            if self._snapshot is not None:
+                entries.extend(
+                    (key, value, expiry) for key, value, expiry in self._snapshot
+                    if key not in self._shadowed and key not in self.store
+                    and (expiry is None or expiry > now)
+                )
+        return write_snapshot(path, entries)
+
+    def dump_on_exit(self, path):
+        """
+        Dump a snapshot when the interpreter shuts down.
+        :param path: Destination file.
+        """
+        atexit.register(self.dump_snapshot, path)
+
+    def load_snapshot(self, path, lazy=True):
+        """
+        Warm the cache from a snapshot written by dump_snapshot.
+        A lazy load only maps the file; each key is decoded on its first
+        get() and entries that expired in the meantime are skipped.
+        :param path: Snapshot file.
+        :param lazy: Map the file instead of loading every entry now.
+        :return: Number of entries in the snapshot (lazy) or loaded (eager).
+        """
+        reader = SnapshotReader(path)
+        with self.lock:
+            self._detach_snapshot()
+            if lazy:
+                self._snapshot = reader
+                return reader.count
+            now = time.time()
+            loaded = 0
+            for key, value, expiry in reader:
+                if expiry is None or expiry > now:
+                    self.set(key, value, expiry - now if expiry else None)
+                    loaded += 1
+            reader.close()
+            return loaded
+
+    def finish_warmup(self):
+        """
+        Load every snapshot entry not read yet and release the snapshot.
+        :return: Number of entries loaded.
+        """
+        with self.lock:
+            if self._snapshot is None:
+                return 0
+            reader, shadowed = self._snapshot, self._shadowed
+            self._snapshot, self._shadowed = None, set()
+            now = time.time()
+            loaded = 0
+            for key, value, expiry in reader:
+                if key in shadowed or (expiry is not None and expiry <= now):
+                    continue
+                self.set(key, value, expiry - now if expiry else None)
+                loaded += 1
+            reader.close()
+            return loaded
+
+    def start_sweeper(self, interval=1.0):
+        """
+        Start a daemon thread that drops expired entries periodically.
+        :param interval: Seconds between sweeps.
+        """
+        with self.lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper_stop.clear()
+            self._sweeper = Thread(
+                target=self._sweep_loop, args=(interval,),
+                name="memory-cache-sweeper", daemon=True,
+            )
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        """
+        Stop the background sweeper thread if it is running.
+        """
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def stats(self):
+        """
+        Snapshot of the cache size and eviction counters.
+        :return: Dictionary of entries, bytes, evictions and expirations.
+        """
+        with self.lock:
+            return {
+                "entries": len(self.store),
+                "bytes": self.bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _promote(self, key):
+        """Answer a miss from the snapshot, moving the entry into the store."""
+        if key in self._shadowed:
+            self.metrics.miss()
+            return None
+        # Whatever the outcome, this key is now owned by the live store
+        self._shadowed.add(key)
+        found = self._snapshot.lookup(key)
+        if found is None:
+            self.metrics.miss()
+            return None
+        value, expiry = found
+        now = time.time()
+        if expiry is not None and expiry <= now:
+            self.expirations += 1
+            self.metrics.expiration()
+            self.metrics.miss()
+            return None
+        self.set(key, value, expiry - now if expiry else None)
+        self.metrics.hit()
+        return value
+
+    def _detach_snapshot(self):
+        """Release a lazily loaded snapshot."""
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+            self._shadowed = set()
+
+    def _sweep_loop(self, interval):
+        """Body of the sweeper thread."""
+        while not self._sweeper_stop.wait(interval):
+            with self.lock:
+                self._purge_expired(time.time())
+
+    def _purge_expired(self, now, limit=None):
+        """
+        Pop expired entries off the expiry heap.
+        :param now: Current timestamp.
+        :param limit: Maximum number of heap items to pop (optional).
+        """
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now and limit != 0:
+            expiry, _, key = heapq.heappop(heap)
+            entry = self.store.get(key)
+            # Overwritten or deleted keys leave stale heap items behind
+            if entry is not None and entry.expiry == expiry:
+                self._remove(key)
+                self.expirations += 1
+                self.metrics.expiration()
+            if limit is not None:
+                limit -= 1
+
+    def _compact_heap(self):
+        """Rebuild the expiry heap once stale items dominate it."""
+        if len(self._expiry_heap) <= 2 * len(self.store) + 64:
+            return
+        self._expiry_heap = [
+            (entry.expiry, next(self._seq), key)
+            for key, entry in self.store.items()
+            if entry.expiry is not None
+        ]
+        heapq.heapify(self._expiry_heap)
+
+    def _touch(self, key, entry):
+        """Record an access to a key for the eviction policy."""
+        if self.policy == "lru":
+            self.store.move_to_end(key)
+            return
+        bucket = self._freq_buckets[entry.freq]
+        del bucket[key]
+        if not bucket:
+            del self._freq_buckets[entry.freq]
+            if self._min_freq == entry.freq:
+                self._min_freq += 1
+        entry.freq += 1
+        self._freq_buckets.setdefault(entry.freq, OrderedDict())[key] = None
+
+    def _remove(self, key):
+        """Drop a key and release its bookkeeping."""
+        entry = self.store.pop(key)
+        self.bytes -= entry.size
+        if self.policy == "lfu":
+            bucket = self._freq_buckets[entry.freq]
+            del bucket[key]
+            if not bucket:
+                del self._freq_buckets[entry.freq]
+        return entry
+
+    def _victim(self):
+        """Pick the next key to evict according to the policy."""
+        if self.policy == "lru":
+            return next(iter(self.store))
+        if self._min_freq not in self._freq_buckets:
+            self._min_freq = min(self._freq_buckets)
+        return next(iter(self._freq_buckets[self._min_freq]))
+
+    def _make_room(self, size):
+        """Evict entries until one more entry of `size` bytes fits."""
+        while self.store and (
+            (self.max_entries is not None and len(self.store) >= self.max_entries)
+            or (self.max_bytes is not None and self.bytes + size > self.max_bytes)
+        ):
+            self._remove(self._victim())
+            self.evictions += 1
+            self.metrics.eviction()
@@ -1,39 +1,229 @@
+import logging
 import redis
+import redis.asyncio
 from os import getenv
+from .connection import get_redis
+from .instrumentation import get_metrics, record_lookup
+from .sharding import ShardedRedis
+
+logger = logging.getLogger(__name__)
+
+
+def _size(value):
+    """Length of a value as Redis will store it, for the size histogram."""
+    return len(value) if isinstance(value, (bytes, str)) else len(str(value))
+
 
 class RedisCache:
     """A cache manager using Redis."""
-    def __init__(self):
+    def __init__(self, nodes=None):
+        """
+        Connect to REDIS_HOST/REDIS_PORT/REDIS_DB, or shard keys across
+        `nodes` ("host:port[/db]" strings, or REDIS_NODES comma-separated)
+        with consistent hashing.
+        """
         self.redis_host = getenv("REDIS_HOST", "localhost")
         self.redis_port = int(getenv("REDIS_PORT", 6379))
         self.redis_db = int(getenv("REDIS_DB", 0))
-        self.client = redis.StrictRedis(host=self.redis_host, port=self.redis_port, db=self.redis_db)
+        nodes = nodes or [node for node in getenv("REDIS_NODES", "").split(",") if node]
+        if nodes:
+            self.client = ShardedRedis(nodes)
+        else:
+            self.client = get_redis(self.redis_host, self.redis_port, self.redis_db)
+        self.metrics = get_metrics("redis")
+
+    def _report(self, message, error):
+        """Log a Redis error and count it."""
+        self.metrics.error()
+        logger.warning("%s: %s", message, error)
 
     def set(self, key, value, ttl=None):
         """Set a key-value pair in the cache with optional TTL (Time-to-Live)."""
-        try:
-            self.client.set(key, value, ex=ttl)
-        except redis.RedisError as e:
-            print(f"Error setting cache key: {e}")
+        with self.metrics.timer("set"):
+            try:
+                self.client.set(key, value, ex=ttl)
+                self.metrics.observe_size(_size(value))
+            except redis.RedisError as e:
+                self._report("Error setting cache key", e)
 
     def get(self, key):
         """Get the value for a given key."""
-        try:
-            return self.client.get(key)
-        except redis.RedisError as e:
-            print(f"Error retrieving cache key: {e}")
-            return None
+        with self.metrics.timer("get"):
+            try:
+                value = self.client.get(key)
+            except redis.RedisError as e:
+                self._report("Error retrieving cache key", e)
+                return None
+        record_lookup(self.metrics, value)
+        return value
 
     def delete(self, key):
         """Delete a key from the cache."""
-        try:
-            self.client.delete(key)
-        except redis.RedisError as e:
-            print(f"Error deleting cache key: {e}")
+        with self.metrics.timer("delete"):
+            try:
+                self.client.delete(key)
+            except redis.RedisError as e:
+                self._report("Error deleting cache key", e)
+
+    def get_many(self, keys):
+        """Get the values for several keys in a single MGET round trip."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self.metrics.timer("get_many"):
+            try:
+                values = self.client.mget(keys)
+            except redis.RedisError as e:
+                self._report("Error retrieving cache keys", e)
+                return {}
+        found = {key: value for key, value in zip(keys, values) if value is not None}
+        self.metrics.incr("hits", len(found))
+        self.metrics.incr("misses", len(keys) - len(found))
+        return found
+
+    def set_many(self, mapping, ttl=None):
+        """
+        Set several key-value pairs in one pipelined transaction.
+        `ttl` is either one TTL for every key or a dict of per-key TTLs.
+        """
+        if not mapping:
+            return
+        with self.metrics.timer("set_many"):
+            try:
+                with self.client.pipeline(transaction=True) as pipe:
+                    for key, value in mapping.items():
+                        key_ttl = ttl.get(key) if isinstance(ttl, dict) else ttl
+                        pipe.set(key, value, ex=key_ttl)
+                        self.metrics.observe_size(_size(value))
+                    pipe.execute()
+            except redis.RedisError as e:
+                self._report("Error setting cache keys", e)
+
+    def delete_many(self, keys):
+        """Delete several keys with a single DEL command."""
+        keys = list(keys)
+        if not keys:
+            return
+        with self.metrics.timer("delete_many"):
+            try:
+                self.client.delete(*keys)
+            except redis.RedisError as e:
+                self._report("Error deleting cache keys", e)
 
     def clear(self):
         """Clear the entire cache."""
-        try:
-            self.client.flushdb()
-        except redis.RedisError as e:
-            print(f"Error clearing cache: {e}")
+        with self.metrics.timer("clear"):
+            try:
+                self.client.flushdb()
+            except redis.RedisError as e:
+                self._report("Error clearing cache", e)
+
+
+class AsyncRedisCache:
+    """An asyncio cache manager using Redis, mirroring RedisCache."""
+    def __init__(self, max_connections=50, pool_timeout=5):
+        """
+        Build the client on an explicitly sized connection pool.
+        Coroutines waiting for a connection block up to `pool_timeout`
+        seconds, so concurrent asyncio.gather calls share the pool fairly.
+        """
+        self.redis_host = getenv("REDIS_HOST", "localhost")
+        self.redis_port = int(getenv("REDIS_PORT", 6379))
+        self.redis_db = int(getenv("REDIS_DB", 0))
+        self.pool = redis.asyncio.BlockingConnectionPool(
+            host=self.redis_host, port=self.redis_port, db=self.redis_db,
+            max_connections=max_connections, timeout=pool_timeout,
+        )
+        self.client = redis.asyncio.StrictRedis(connection_pool=self.pool)
+        self.metrics = get_metrics("redis_async")
+
+    def _report(self, message, error):
+        """Log a Redis error and count it."""
+        self.metrics.error()
+        logger.warning("%s: %s", message, error)
+
+    async def set(self, key, value, ttl=None):
+        """Set a key-value pair in the cache with optional TTL (Time-to-Live)."""
+        with self.metrics.timer("set"):
+            try:
+                await self.client.set(key, value, ex=ttl)
+                self.metrics.observe_size(_size(value))
+            except redis.RedisError as e:
+                self._report("Error setting cache key", e)
+
+    async def get(self, key):
+        """Get the value for a given key."""
+        with self.metrics.timer("get"):
+            try:
+                value = await self.client.get(key)
+            except redis.RedisError as e:
+                self._report("Error retrieving cache key", e)
+                return None
+        record_lookup(self.metrics, value)
+        return value
+
+    async def delete(self, key):
+        """Delete a key from the cache."""
+        with self.metrics.timer("delete"):
+            try:
+                await self.client.delete(key)
+            except redis.RedisError as e:
+                self._report("Error deleting cache key", e)
+
+    async def get_many(self, keys):
+        """Get the values for several keys in a single MGET round trip."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self.metrics.timer("get_many"):
+            try:
+                values = await self.client.mget(keys)
+            except redis.RedisError as e:
+                self._report("Error retrieving cache keys", e)
+                return {}
+        found = {key: value for key, value in zip(keys, values) if value is not None}
+        self.metrics.incr("hits", len(found))
+        self.metrics.incr("misses", len(keys) - len(found))
+        return found
+
+    async def set_many(self, mapping, ttl=None):
+        """
+        Set several key-value pairs in one pipelined transaction.
+        `ttl` is either one TTL for every key or a dict of per-key TTLs.
+        """
+        if not mapping:
+            return
+        with self.metrics.timer("set_many"):
+            try:
+                async with self.client.pipeline(transaction=True) as pipe:
+                    for key, value in mapping.items():
+                        key_ttl = ttl.get(key) if isinstance(ttl, dict) else ttl
+                        pipe.set(key, value, ex=key_ttl)
+                        self.metrics.observe_size(_size(value))
+                    await pipe.execute()
+            except redis.RedisError as e:
+                self._report("Error setting cache keys", e)
+
+    async def delete_many(self, keys):
+        """Delete several keys with a single DEL command."""
+        keys = list(keys)
+        if not keys:
+            return
+        with self.metrics.timer("delete_many"):
+            try:
+                await self.client.delete(*keys)
+            except redis.RedisError as e:
+                self._report("Error deleting cache keys", e)
+
+    async def clear(self):
+        """Clear the entire cache."""
+        with self.metrics.timer("clear"):
+            try:
+                await self.client.flushdb()
+            except redis.RedisError as e:
+                self._report("Error clearing cache", e)
+
+    async def close(self):
+        """Close the client and release the pool's connections."""
+        await self.client.aclose()
+        await self.pool.disconnect()
@@ -1,12 +1,35 @@
 import redis
-import json
+import redis.asyncio
 from datetime import timedelta
+from .connection import get_redis
+from .instrumentation import get_metrics, record_lookup
+from .serializers import ValueCodec
+from .sharding import ShardedRedis
 
 class RedisClient:
     """Handles Redis caching operations."""
 
-    def __init__(self, host="localhost", port=6379, db=0):
-        self.client = redis.StrictRedis(host=host, port=port, db=db, decode_responses=True)
+    def __init__(self, host="localhost", port=6379, db=0, serializer=None,
+                 compress_threshold=None, accept=None, nodes=None):
+        """
+        Args:
+            host (str): Redis host.
+            port (int): Redis port.
+            db (int): Redis database number.
+            serializer (Serializer or str, optional): Value codec, JSON by default.
+            compress_threshold (int, optional): Compress payloads of at least
+                this many bytes with zlib; off by default, see ValueCodec.
+            accept (iterable, optional): Extra codecs accepted on reads.
+            nodes (list, optional): "host:port[/db]" nodes to shard keys
+                across with consistent hashing, instead of host/port/db.
+        """
+        self.codec = ValueCodec(serializer, compress_threshold, accept=accept)
+        # Shared pool; framed payloads are binary, so responses stay undecoded
+        if nodes:
+            self.client = ShardedRedis(nodes)
+        else:
+            self.client = get_redis(host, port, db)
+        self.metrics = get_metrics("redis_client")
 
     def set(self, key, value, expiry_seconds=None):
         """
@@ -14,14 +37,16 @@ class RedisClient:
 
         Args:
             key (str): Redis key.
-            value (any): Value to store (serialized to JSON).
+            value (any): Value to store (serialized with the configured codec).
             expiry_seconds (int, optional): Time to live for the key in seconds.
         """
-        value = json.dumps(value)
-        if expiry_seconds:
-            self.client.setex(key, timedelta(seconds=expiry_seconds), value)
-        else:
-            self.client.set(key, value)
+        value = self.codec.encode(value)
+        self.metrics.observe_size(len(value))
+        with self.metrics.timer("set"):
+            if expiry_seconds:
+                self.client.setex(key, timedelta(seconds=expiry_seconds), value)
+            else:
+                self.client.set(key, value)
 
     def get(self, key):
         """
@@ -33,8 +58,10 @@ class RedisClient:
         Returns:
             any: Deserialized value, or None if key doesn't exist.
         """
-        value = self.client.get(key)
-        return json.loads(value) if value else None
+        with self.metrics.timer("get"):
+            value = self.client.get(key)
+        record_lookup(self.metrics, value)
+        return self.codec.decode(value) if value else None
 
     def delete(self, key):
         """
@@ -46,4 +73,199 @@ class RedisClient:
         Returns:
             bool: True if key was deleted, False otherwise.
         """
-        return self.client.delete(key) > 0
+        with self.metrics.timer("delete"):
+            return self.client.delete(key) > 0
+
+    def get_many(self, keys):
+        """
+        Retrieve several keys in a single MGET round trip.
+
+        Args:
+            keys (iterable): Redis keys.
+
+        Returns:
+            dict: Deserialized values of the keys that exist.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self.metrics.timer("get_many"):
+            values = self.client.mget(keys)
+        found = {key: self.codec.decode(value) for key, value in zip(keys, values) if value}
+        self.metrics.incr("hits", len(found))
+        self.metrics.incr("misses", len(keys) - len(found))
+        return found
+
+    def set_many(self, mapping, expiry_seconds=None):
+        """
+        Set several key-value pairs in one pipelined transaction.
+
+        Args:
+            mapping (dict): Keys and values to store (serialized with the configured codec).
+            expiry_seconds (int or dict, optional): One TTL for every key, or
+                a dict of per-key TTLs in seconds.
+        """
+        if not mapping:
+            return
+        with self.metrics.timer("set_many"), self.client.pipeline(transaction=True) as pipe:
+            for key, value in mapping.items():
+                if isinstance(expiry_seconds, dict):
+                    ttl = expiry_seconds.get(key)
+                else:
+                    ttl = expiry_seconds
+                payload = self.codec.encode(value)
+                self.metrics.observe_size(len(payload))
+                pipe.set(key, payload, ex=ttl or None)
+            pipe.execute()
+
+    def delete_many(self, keys):
+        """
+        Delete several keys with a single DEL command.
+
+        Args:
+            keys (iterable): Redis keys.
+
+        Returns:
+            int: Number of keys that were deleted.
+        """
+        keys = list(keys)
+        if not keys:
+            return 0
+        with self.metrics.timer("delete_many"):
+            return self.client.delete(*keys)
+
+
+class AsyncRedisClient:
+    """Handles Redis caching operations on asyncio, mirroring RedisClient."""
+
+    def __init__(self, host="localhost", port=6379, db=0, serializer=None,
+                 compress_threshold=None, accept=None, max_connections=50, pool_timeout=5):
+        """
+        Args:
+            host (str): Redis host.
+            port (int): Redis port.
+            db (int): Redis database number.
+            serializer (Serializer or str, optional): Value codec, JSON by default.
+            compress_threshold (int, optional): Compress payloads of at least
+                this many bytes with zlib; off by default, see ValueCodec.
+            accept (iterable, optional): Extra codecs accepted on reads.
+            max_connections (int): Size of the connection pool; bounds how many
+                commands run concurrently under asyncio.gather.
+            pool_timeout (int): Seconds to wait for a free pooled connection.
+        """
+        self.codec = ValueCodec(serializer, compress_threshold, accept=accept)
+        self.pool = redis.asyncio.BlockingConnectionPool(
+            host=host, port=port, db=db,
+            max_connections=max_connections, timeout=pool_timeout,
+        )
+        self.client = redis.asyncio.StrictRedis(connection_pool=self.pool)
+        self.metrics = get_metrics("redis_client_async")
+
+    async def set(self, key, value, expiry_seconds=None):
+        """
+        Set a key-value pair in Redis.
+
+        Args:
+            key (str): Redis key.
+            value (any): Value to store (serialized with the configured codec).
+            expiry_seconds (int, optional): Time to live for the key in seconds.
+        """
+        value = self.codec.encode(value)
+        self.metrics.observe_size(len(value))
+        with self.metrics.timer("set"):
+            if expiry_seconds:
+                await self.client.setex(key, timedelta(seconds=expiry_seconds), value)
+            else:
+                await self.client.set(key, value)
+
+    async def get(self, key):
+        """
+        Retrieve a value by key.
+
+        Args:
+            key (str): Redis key.
+
+        Returns:
+            any: Deserialized value, or None if key doesn't exist.
+        """
+        with self.metrics.timer("get"):
+            value = await self.client.get(key)
+        record_lookup(self.metrics, value)
+        return self.codec.decode(value) if value else None
+
+    async def delete(self, key):
+        """
+        Delete a key from Redis.
+
+        Args:
+            key (str): Redis key.
+
+        Returns:
+            bool: True if key was deleted, False otherwise.
+        """
+        with self.metrics.timer("delete"):
+            return await self.client.delete(key) > 0
+
+    async def get_many(self, keys):
+        """
+        Retrieve several keys in a single MGET round trip.
+
+        Args:
+            keys (iterable): Redis keys.
+
+        Returns:
+            dict: Deserialized values of the keys that exist.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self.metrics.timer("get_many"):
+            values = await self.client.mget(keys)
+        found = {key: self.codec.decode(value) for key, value in zip(keys, values) if value}
+        self.metrics.incr("hits", len(found))
+        self.metrics.incr("misses", len(keys) - len(found))
+        return found
+
+    async def set_many(self, mapping, expiry_seconds=None):
+        """
+        Set several key-value pairs in one pipelined transaction.
+
+        Args:
+            mapping (dict): Keys and values to store (serialized with the configured codec).
+            expiry_seconds (int or dict, optional): One TTL for every key, or
+                a dict of per-key TTLs in seconds.
+        """
+        if not mapping:
+            return
+        with self.metrics.timer("set_many"):
+            async with self.client.pipeline(transaction=True) as pipe:
+                for key, value in mapping.items():
+                    if isinstance(expiry_seconds, dict):
+                        ttl = expiry_seconds.get(key)
+                    else:
+                        ttl = expiry_seconds
+                    payload = self.codec.encode(value)
+                    self.metrics.observe_size(len(payload))
+                    pipe.set(key, payload, ex=ttl or None)
+                await pipe.execute()
+
+    async def delete_many(self, keys):
+        """
+        Delete several keys with a single DEL command.
+
+        Args:
+            keys (iterable): Redis keys.
+
+        Returns:
+            int: Number of keys that were deleted.
+        """
+        keys = list(keys)
+        if not keys:
+            return 0
+        with self.metrics.timer("delete_many"):
+            return await self.client.delete(*keys)
+
+    async def close(self):
+        """Close the client and release the pool's connections."""
+        await self.client.aclose()
+        await self.pool.disconnect()
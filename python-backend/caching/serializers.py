@@ -0,0 +1,159 @@
+import json
+import pickle
+import zlib
+from abc import ABC, abstractmethod
+
+# Legacy payloads are bare JSON text, which always starts with an ASCII
+# byte, so any first byte >= 0x80 unambiguously marks a framed payload:
+#   1 H C C C C C C   H = compressed with zlib, C = codec id
+HEADER_MARKER = 0x80
+COMPRESSED_FLAG = 0x40
+CODEC_MASK = 0x3F
+
+
+class Serializer(ABC):
+    """Base class of the value codecs RedisClient can plug in."""
+
+    codec_id = None
+    name = None
+
+    @abstractmethod
+    def dumps(self, value):
+        """Serialize a value to bytes."""
+
+    @abstractmethod
+    def loads(self, data):
+        """Deserialize bytes produced by dumps."""
+
+
+class JsonSerializer(Serializer):
+    """Standard library JSON; the format RedisClient has always written."""
+
+    codec_id = 0
+    name = "json"
+
+    def dumps(self, value):
+        return json.dumps(value).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer(Serializer):
+    """orjson: JSON compatible, much faster, encodes datetimes as ISO strings."""
+
+    codec_id = 1
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, value):
+        return self._orjson.dumps(value)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    """msgpack: compact binary, keeps bytes and timezone-aware datetimes."""
+
+    codec_id = 2
+    name = "msgpack"
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, value):
+        return self._msgpack.packb(value, use_bin_type=True, datetime=True)
+
+    def loads(self, data):
+        return self._msgpack.unpackb(data, raw=False, timestamp=3)
+
+
+class PickleSerializer(Serializer):
+    """pickle: any Python object. Only decode data your own services wrote."""
+
+    codec_id = 3
+    name = "pickle"
+
+    def dumps(self, value):
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+
+SERIALIZERS = {
+    cls.name: cls
+    for cls in (JsonSerializer, OrjsonSerializer, MsgpackSerializer, PickleSerializer)
+}
+
+
+def get_serializer(serializer):
+    """Resolve a serializer instance from an instance or a registered name."""
+    if serializer is None:
+        return JsonSerializer()
+    if isinstance(serializer, Serializer):
+        return serializer
+    try:
+        return SERIALIZERS[serializer]()
+    except KeyError:
+        raise ValueError(f"Unknown serializer: {serializer}")
+
+
+class ValueCodec:
+    """Frames serialized values with a header byte and optional zlib compression."""
+
+    def __init__(self, serializer=None, compress_threshold=None, compress_level=6, accept=None):
+        """
+        Args:
+            serializer (Serializer or str, optional): Codec used for writes, JSON by default.
+            compress_threshold (int, optional): Payloads at least this many bytes
+                are compressed; None (the default) disables compression. Only
+                enable it once every reader decodes framed payloads: readers
+                that predate the header byte cannot read compressed values.
+            compress_level (int): zlib compression level.
+            accept (iterable, optional): Extra serializers allowed on reads, for
+                switching codecs during a rollout. The write codec and legacy
+                JSON are always accepted.
+        """
+        self.serializer = get_serializer(serializer)
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self.readers = {JsonSerializer.codec_id: JsonSerializer()}
+        for reader in [self.serializer, *(get_serializer(s) for s in accept or ())]:
+            self.readers[reader.codec_id] = reader
+
+    def encode(self, value):
+        """
+        Serialize and frame a value.
+
+        Uncompressed JSON is written bare so readers that predate the header
+        byte keep working during a rollout.
+        """
+        payload = self.serializer.dumps(value)
+        flags = 0
+        if self.compress_threshold is not None and len(payload) >= self.compress_threshold:
+            payload = zlib.compress(payload, self.compress_level)
+            flags = COMPRESSED_FLAG
+        if flags == 0 and self.serializer.codec_id == JsonSerializer.codec_id:
+            return payload
+        return bytes((HEADER_MARKER | flags | self.serializer.codec_id,)) + payload
+
+    def decode(self, data):
+        """Decode a framed or legacy bare-JSON payload."""
+        if isinstance(data, str):
+            return json.loads(data)
+        if not data or data[0] < HEADER_MARKER:
+            return json.loads(data)
+        header = data[0]
+        reader = self.readers.get(header & CODEC_MASK)
+        if reader is None:
+            raise ValueError(f"Payload codec {header & CODEC_MASK} is not accepted")
+        payload = data[1:]
+        if header & COMPRESSED_FLAG:
+            payload = zlib.decompress(payload)
+        return reader.loads(payload)
@@ -1,6 +1,11 @@
-from cache.redis_cache import RedisCache
+import json
+import time
+from datetime import datetime
 from uuid import uuid4
 
+from .connection import get_redis
+from .redis_cache import AsyncRedisCache, RedisCache
+
 class SessionManager:
     """Manages user sessions using Redis as the backend."""
     def __init__(self):
@@ -26,3 +31,208 @@ class SessionManager:
     def clear_sessions(self):
         """Clear all sessions."""
         self.cache.clear()
+
+
+class AsyncSessionManager:
+    """Manages user sessions on asyncio using Redis as the backend."""
+    def __init__(self, max_connections=50):
+        self.cache = AsyncRedisCache(max_connections=max_connections)
+
+    async def create_session(self, user_id):
+        """Create a new session for a user."""
+        session_id = str(uuid4())  # Generate a unique session ID
+        await self.cache.set(session_id, user_id, ttl=3600)  # Session valid for 1 hour
+        return session_id
+
+    async def get_user(self, session_id):
+        """Retrieve the user ID associated with a session ID."""
+        user_id = await self.cache.get(session_id)
+        if user_id:
+            return user_id.decode()  # Decode byte response
+        return None
+
+    async def get_users(self, session_ids):
+        """Retrieve the user IDs of several sessions in one round trip."""
+        found = await self.cache.get_many(session_ids)
+        return {session_id: user_id.decode() for session_id, user_id in found.items()}
+
+    async def delete_session(self, session_id):
+        """Delete a session."""
+        await self.cache.delete(session_id)
+
+    async def clear_sessions(self):
+        """Clear all sessions."""
+        await self.cache.clear()
+
+    async def close(self):
+        """Release the Redis connection pool."""
+        await self.cache.close()
+
+
+class RedisSessionManager:
+    """
+    Sessions stored as Redis hashes, with the same API as
+    auth.session_manager.SessionManager so the two can be swapped.
+    Each session is one hash read with a single HGETALL; a sorted set
+    per user (scored by creation time) lists that user's sessions for
+    lookup and bulk revocation, and one sorted set scored by expiry backs
+    count(). Sliding expiration is one pipelined touch, sent at most once
+    per refresh_interval per session. user_id is stored as JSON so it comes
+    back with its original type, as from the in-memory manager.
+    """
+    RESERVED = ("user_id", "expires_at", "refreshed_at")  # not allowed as data keys
+
+    def __init__(self, expiry_minutes=60, sliding=False, refresh_interval=None,
+                 max_sessions_per_user=None, client=None, prefix="session"):
+        self.client = client
+        self.expiry_minutes = expiry_minutes
+        self.sliding = sliding
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None else expiry_minutes * 6
+        )
+        self.max_sessions_per_user = max_sessions_per_user
+        self.prefix = prefix
+
+    @property
+    def redis(self):
+        """Client in use; the shared pool unless one was passed in."""
+        return self.client if self.client is not None else get_redis()
+
+    @property
+    def ttl(self):
+        """Session lifetime in seconds."""
+        return int(self.expiry_minutes * 60)
+
+    def _session_key(self, session_id):
+        return f"{self.prefix}:{session_id}"
+
+    def _user_key(self, user_id):
+        return f"{self.prefix}:user:{json.dumps(user_id)}"
+
+    @property
+    def _expiry_key(self):
+        return f"{self.prefix}:expiry"
+
+    @staticmethod
+    def _decode(raw):
+        """HGETALL reply to a session dict, or None if empty."""
+        if not raw:
+            return None
+        fields = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                  for k, v in raw.items()}
+        session = {k[5:]: json.loads(v) for k, v in fields.items() if k.startswith("data:")}
+        session["user_id"] = json.loads(fields["user_id"])
+        session["expires_at"] = float(fields["expires_at"])
+        session["refreshed_at"] = float(fields["refreshed_at"])
+        return session
+
+    @staticmethod
+    def _public(session):
+        """Session dict as returned by the in-memory SessionManager."""
+        public = {k: v for k, v in session.items() if k != "refreshed_at"}
+        public["expires_at"] = datetime.utcfromtimestamp(session["expires_at"])
+        return public
+
+    def create_session(self, user_id, data=None):
+        """Create a session in one transaction; returns its id and expiry."""
+        clashes = [k for k in (data or ()) if k in self.RESERVED]
+        if clashes:
+            raise ValueError(f"Reserved session data keys: {', '.join(clashes)}")
+        now = time.time()
+        session_id = str(uuid4())
+        mapping = {f"data:{k}": json.dumps(v) for k, v in (data or {}).items()}
+        mapping.update(user_id=json.dumps(user_id), expires_at=now + self.ttl, refreshed_at=now)
+        user_key = self._user_key(user_id)
+        pipe = self.redis.pipeline()
+        pipe.hset(self._session_key(session_id), mapping=mapping)
+        pipe.expire(self._session_key(session_id), self.ttl)
+        # Sessions that lapse through their TTL are dropped from the index here
+        pipe.zremrangebyscore(self._expiry_key, "-inf", now)
+        pipe.zadd(self._expiry_key, {session_id: now + self.ttl})
+        pipe.zadd(user_key, {session_id: now})
+        pipe.expire(user_key, self.ttl)
+        if self.max_sessions_per_user:
+            # Everything but the newest max_sessions_per_user members
+            pipe.zrange(user_key, 0, -(self.max_sessions_per_user + 1))
+        results = pipe.execute()
+        if self.max_sessions_per_user and results[-1]:
+            self._delete_many(user_key, results[-1])
+        return {"session_id": session_id, "expires_at": datetime.utcfromtimestamp(now + self.ttl)}
+
+    def get_session(self, session_id):
+        """Session data if valid, or None; slides the expiry when due."""
+        key = self._session_key(session_id)
+        session = self._decode(self.redis.hgetall(key))
+        now = time.time()
+        if session is None or session["expires_at"] <= now:
+            return None
+        if self.sliding and now - session["refreshed_at"] >= self.refresh_interval:
+            session["expires_at"] = now + self.ttl
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping={"expires_at": session["expires_at"], "refreshed_at": now})
+            pipe.expire(key, self.ttl)
+            pipe.zadd(self._expiry_key, {session_id: session["expires_at"]})
+            pipe.expire(self._user_key(session["user_id"]), self.ttl)
+            pipe.execute()
+        return self._public(session)
+
+    def get_user_sessions(self, user_id):
+        """A user's live sessions, oldest first, read in one pipeline."""
+        user_key = self._user_key(user_id)
+        session_ids = [s.decode() if isinstance(s, bytes) else s
+                       for s in self.redis.zrange(user_key, 0, -1)]
+        if not session_ids:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hgetall(self._session_key(session_id))
+        now, result, gone = time.time(), [], []
+        for session_id, raw in zip(session_ids, pipe.execute()):
+            session = self._decode(raw)
+            if session is None or session["expires_at"] <= now:
+                gone.append(session_id)
+            else:
+                result.append(dict(self._public(session), session_id=session_id))
+        if gone:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrem(user_key, *gone)
+            pipe.zrem(self._expiry_key, *gone)
+            pipe.execute()
+        return result
+
+    def delete_session(self, session_id):
+        """Delete a session; returns True if it existed."""
+        key = self._session_key(session_id)
+        user_id = self.redis.hget(key, "user_id")
+        if user_id is None:
+            return False
+        return self._delete_many(self._user_key(json.loads(user_id)), [session_id]) > 0
+
+    def revoke_all(self, user_id):
+        """Delete every session of a user; returns how many existed."""
+        user_key = self._user_key(user_id)
+        session_ids = [s.decode() if isinstance(s, bytes) else s
+                       for s in self.redis.zrange(user_key, 0, -1)]
+        pipe = self.redis.pipeline()
+        if session_ids:
+            pipe.delete(*[self._session_key(s) for s in session_ids])
+            pipe.zrem(self._expiry_key, *session_ids)
+        pipe.delete(user_key)
+        results = pipe.execute()
+        return results[0] if session_ids else 0
+
+    def count(self):
+        """Number of live sessions; expired ones are dropped from the index first."""
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(self._expiry_key, "-inf", time.time())
+        pipe.zcard(self._expiry_key)
+        return pipe.execute()[1]
+
+    def _delete_many(self, user_key, session_ids):
+        """Delete sessions and unlink them from the user's set in one transaction."""
+        session_ids = [s.decode() if isinstance(s, bytes) else s for s in session_ids]
+        pipe = self.redis.pipeline()
+        pipe.delete(*[self._session_key(s) for s in session_ids])
+        pipe.zrem(user_key, *session_ids)
+        pipe.zrem(self._expiry_key, *session_ids)
+        return pipe.execute()[0]
@@ -0,0 +1,126 @@
+from .memory_cache import MemoryCache
+
+
+class ShardedMemoryCache:
+    """A MemoryCache split into independently locked segments."""
+
+    def __init__(self, shards=16, max_entries=None, max_bytes=None, policy="lru", name="memory"):
+        """
+        :param shards: Number of segments, each with its own lock.
+        :param max_entries: Maximum number of entries across all shards (optional).
+        :param max_bytes: Approximate memory budget across all shards (optional).
+        :param policy: Eviction policy of every shard, "lru" or "lfu".
+        :param name: Backend name the shards report metrics under.
+        """
+        if shards < 1:
+            raise ValueError("ShardedMemoryCache needs at least one shard")
+        # Limits are split evenly; eviction is per shard, so they are approximate
+        per_entries = -(-max_entries // shards) if max_entries else None
+        per_bytes = -(-max_bytes // shards) if max_bytes else None
+        self.shards = [
+            MemoryCache(max_entries=per_entries, max_bytes=per_bytes, policy=policy, name=name)
+            for _ in range(shards)
+        ]
+
+    def _shard(self, key):
+        """Return the segment owning a key."""
+        return self.shards[hash(key) % len(self.shards)]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a key-value pair in the cache with an optional Time-To-Live (TTL).
+        :param key: The key to store.
+        :param value: The value to store.
+        :param ttl: Time-to-live in seconds (optional).
+        """
+        self._shard(key).set(key, value, ttl)
+
+    def get(self, key):
+        """
+        Retrieve a value from the cache by key.
+        :param key: The key to retrieve.
+        :return: The value if the key exists and is not expired, else None.
+        """
+        return self._shard(key).get(key)
+
+    def delete(self, key):
+        """
+        Delete a key-value pair from the cache.
+        :param key: The key to delete.
+        """
+        self._shard(key).delete(key)
+
+    def _group(self, keys):
+        """Bucket keys by the shard that owns them."""
+        groups = {}
+        for key in keys:
+            groups.setdefault(hash(key) % len(self.shards), []).append(key)
+        return [(self.shards[index], group) for index, group in groups.items()]
+
+    def get_many(self, keys):
+        """
+        Retrieve several keys, taking each shard lock once.
+        :param keys: The keys to retrieve.
+        :return: Dictionary of the keys that exist and are not expired.
+        """
+        result = {}
+        for shard, shard_keys in self._group(keys):
+            result.update(shard.get_many(shard_keys))
+        return result
+
+    def set_many(self, mapping, ttl=None):
+        """
+        Store several key-value pairs, taking each shard lock once.
+        :param mapping: Dictionary of keys and values to store.
+        :param ttl: One TTL for every key, or a dictionary of per-key TTLs (optional).
+        """
+        for shard, shard_keys in self._group(mapping):
+            shard.set_many({key: mapping[key] for key in shard_keys}, ttl)
+
+    def delete_many(self, keys):
+        """
+        Delete several keys, taking each shard lock once.
+        :param keys: The keys to delete.
+        """
+        for shard, shard_keys in self._group(keys):
+            shard.delete_many(shard_keys)
+
+    def clear(self):
+        """
+        Clear all entries from every shard.
+        """
+        for shard in self.shards:
+            shard.clear()
+
+    def count(self):
+        """
+        Count the number of live entries across all shards.
+        :return: Number of unexpired entries.
+        """
+        return sum(shard.count() for shard in self.shards)
+
+    def stats(self):
+        """
+        Aggregate size and eviction counters of all shards.
+        :return: Dictionary of entries, bytes, evictions and expirations.
+        """
+        totals = {"entries": 0, "bytes": 0, "evictions": 0, "expirations": 0}
+        for shard in self.shards:
+            for name, value in shard.stats().items():
+                totals[name] += value
+        return totals
+
+    def start_sweeper(self, interval=1.0):
+        """
+        Start the background expiry sweeper of every shard.
+        :param interval: Seconds between sweeps.
+        """
+        for shard in self.shards:
+            shard.start_sweeper(interval)
+
+    def stop_sweeper(self):
+        """
+        Stop the background expiry sweeper of every shard.
+        """
+        for shard in self.shards:
+            shard.stop_sweeper()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+""" client-side sharding across redis nodes with consistent hashing """
+
+import hashlib
+from bisect import bisect, insort
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .connection import get_redis, register
+
+Node = Union[str, Tuple[str, int, int]]
+
+
+def hash_tag(key) -> bytes:
+    """
+    Part of a key that is hashed: the text inside the first non-empty
+    {...}, so "{user:1}:cart" and "{user:1}:profile" land together.
+    """
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def _hash(data: bytes) -> int:
+    """ 64-bit position on the ring """
+    return int.from_bytes(hashlib.md5(data).digest()[:8], "big")
+
+
+def parse_node(node: Node) -> Tuple[str, int, int]:
+    """ "host:port[/db]" or (host, port, db) -> (host, port, db) """
+    if not isinstance(node, str):
+        return tuple(node)
+    address, _, db = node.partition("/")
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port or 6379), int(db or 0)
+
+
+class HashRing:
+    """ Consistent-hash ring with virtual nodes """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        """
+        :param nodes: node names
+        :param vnodes: points per node; more points, smoother spread
+        """
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: str) -> None:
+        """ Place a node's virtual points; only ~1/N of keys move """
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.vnodes):
+            point = _hash(f"{node}#{replica}".encode("utf-8"))
+            if point not in self._owners:
+                self._owners[point] = node
+                insort(self._points, point)
+
+    def remove_node(self, node: str) -> None:
+        """ Drop a node; its keys move to the following points """
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        self._points = [p for p in self._points if self._owners[p] != node]
+        self._owners = {p: self._owners[p] for p in self._points}
+
+    def get_node(self, key) -> str:
+        """ Node owning a key, honoring {hash-tag} syntax """
+        if not self._points:
+            raise ValueError("HashRing has no nodes")
+        index = bisect(self._points, _hash(hash_tag(key)))
+        return self._owners[self._points[index % len(self._points)]]
+
+
+class ShardedRedis:
+    """
+    Routes commands over several redis nodes. Exposes the subset of
+    the redis client API the caching classes use, so RedisClient and
+    RedisCache work unchanged on top of it. Multi-key commands are
+    split per node and run in parallel on a thread pool that is started
+    on first use, stopped by close() or connection.close_all(), and
+    replaced in forked children.
+    """
+
+    def __init__(self, nodes: Iterable[Node], vnodes: int = 160, workers: int = 16):
+        """
+        :param nodes: "host:port[/db]" strings or (host, port, db) tuples
+        :param vnodes: virtual nodes per node
+        :param workers: threads running per-node calls in parallel
+        """
+        self.addresses = {}
+        for node in nodes:
+            address = parse_node(node)
+            self.addresses["{}:{}/{}".format(*address)] = address
+        if not self.addresses:
+            raise ValueError("ShardedRedis needs at least one node")
+        self.ring = HashRing(self.addresses, vnodes)
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = Lock()
+        register(self)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """ Thread pool for parallel per-node calls, started on first use """
+        executor = self._executor
+        if executor is None:
+            with self._executor_lock:
+                executor = self._executor
+                if executor is None:
+                    executor = self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="redis-shard")
+        return executor
+
+    def close(self) -> None:
+        """ Stop the worker threads; a later fan-out starts new ones """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def reset(self) -> None:
+        """
+        Forget the thread pool without joining it. Runs in forked
+        children, where the parent's worker threads do not exist.
+        """
+        self._executor_lock = Lock()
+        self._executor = None
+
+    def add_node(self, node: Node) -> None:
+        """ Add a node to the ring """
+        address = parse_node(node)
+        name = "{}:{}/{}".format(*address)
+        self.addresses[name] = address
+        self.ring.add_node(name)
+
+    def node_client(self, name: str):
+        """ Pooled client of one node """
+        return get_redis(*self.addresses[name])
+
+    def client_for(self, key):
+        """ Pooled client of the node owning a key """
+        return self.node_client(self.ring.get_node(key))
+
+    def group(self, keys: Iterable) -> Dict[str, list]:
+        """ Bucket keys by owning node """
+        groups: Dict[str, list] = {}
+        for key in keys:
+            groups.setdefault(self.ring.get_node(key), []).append(key)
+        return groups
+
+    def fan_out(self, calls: Dict[str, Callable]) -> Dict[str, object]:
+        """ Run one callable per node, in parallel when there are several """
+        if len(calls) == 1:
+            (name, call), = calls.items()
+            return {name: call(self.node_client(name))}
+        executor = self.executor
+        futures = {name: executor.submit(call, self.node_client(name))
+                   for name, call in calls.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def get(self, key):
+        """ GET on the owning node """
+        return self.client_for(key).get(key)
+
+    def set(self, key, value, **kwargs):
+        """ SET on the owning node """
+        return self.client_for(key).set(key, value, **kwargs)
+
+    def setex(self, key, time, value):
+        """ SETEX on the owning node """
+        return self.client_for(key).setex(key, time, value)
+
+    def delete(self, *keys) -> int:
+        """ DEL split per node """
+        groups = self.group(keys)
+        results = self.fan_out({
+            name: (lambda client, ks=ks: client.delete(*ks)) for name, ks in groups.items()
+        })
+        return sum(results.values())
+
+    def mget(self, keys) -> list:
+        """ MGET split per node, values back in key order """
+        keys = list(keys)
+        groups = self.group(keys)
+        results = self.fan_out({
+            name: (lambda client, ks=ks: client.mget(ks)) for name, ks in groups.items()
+        })
+        found = {}
+        for name, ks in groups.items():
+            found.update(zip(ks, results[name]))
+        return [found[key] for key in keys]
+
+    def flushdb(self):
+        """ FLUSHDB on every node """
+        self.fan_out({name: (lambda client: client.flushdb()) for name in self.addresses})
+        return True
+
+    def publish(self, channel, message):
+        """ Pub/sub lives on the first node so subscribers see every message """
+        return self.node_client(self.ring.nodes[0]).publish(channel, message)
+
+    def pubsub(self, **kwargs):
+        """ PubSub object on the first node """
+        return self.node_client(self.ring.nodes[0]).pubsub(**kwargs)
+
+    def pipeline(self, transaction: bool = True) -> "ShardedPipeline":
+        """ Pipeline fanning out per node on execute() """
+        return ShardedPipeline(self, transaction)
+
+
+class ShardedPipeline:
+    """
+    Buffers keyed commands and executes one pipeline per node in
+    parallel. Transactions are atomic per node, not across nodes.
+    """
+
+    def __init__(self, router: ShardedRedis, transaction: bool):
+        self.router = router
+        self.transaction = transaction
+        self._commands: List[Tuple[str, str, tuple, dict]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._commands.clear()
+        return False
+
+    def _queue(self, command: str, key, *args, **kwargs):
+        """ Buffer one keyed command """
+        self._commands.append((command, key, args, kwargs))
+        return self
+
+    def set(self, key, value, **kwargs):
+        """ Queue SET """
+        return self._queue("set", key, value, **kwargs)
+
+    def setex(self, key, time, value):
+        """ Queue SETEX """
+        return self._queue("setex", key, time, value)
+
+    def get(self, key):
+        """ Queue GET """
+        return self._queue("get", key)
+
+    def delete(self, key):
+        """ Queue DEL """
+        return self._queue("delete", key)
+
+    def execute(self) -> list:
+        """ Run the buffered commands; results come back in call order """
+        by_node: Dict[str, List[int]] = {}
+        for index, (_, key, _, _) in enumerate(self._commands):
+            by_node.setdefault(self.router.ring.get_node(key), []).append(index)
+
+        def run(indexes):
+            def call(client):
+                pipe = client.pipeline(transaction=self.transaction)
+                for i in indexes:
+                    command, key, args, kwargs = self._commands[i]
+                    getattr(pipe, command)(key, *args, **kwargs)
+                return pipe.execute()
+            return call
+
+        results = self.router.fan_out({name: run(ix) for name, ix in by_node.items()}) \
+            if by_node else {}
+        ordered = [None] * len(self._commands)
+        for name, indexes in by_node.items():
+            for i, result in zip(indexes, results[name]):
+                ordered[i] = result
+        self._commands.clear()
+        return ordered
@@ -0,0 +1,166 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import time
+
+# File layout, little-endian:
+#   header   magic, record count, index offset, creation time
+#   records  (expiry or 0.0, key length, value length) + pickled key + pickled value
+#   index    (key hash, record offset) per record, sorted by hash
+MAGIC = b"MCSNAP01"
+HEADER = struct.Struct("<8sQQd")
+RECORD = struct.Struct("<dII")
+INDEX = struct.Struct("<QQ")
+
+
+def canonical_key(key):
+    """
+    Reduce a key to one form per dict-equal value, so 1, 1.0 and True
+    encode alike and a lazy lookup finds what an eager load would.
+    :param key: str, bytes, int, float, bool, None, or a tuple of these.
+    :return: Key with integral numbers as int and str/bytes subclasses as the base type.
+    :raises TypeError: For other keys, whose pickled form is not canonical.
+    """
+    if key is None:
+        return key
+    if isinstance(key, str):
+        return str(key)
+    if isinstance(key, bytes):
+        return bytes(key)
+    if isinstance(key, int):  # bool included
+        return int(key)
+    if isinstance(key, float):
+        return int(key) if key.is_integer() else key
+    if isinstance(key, tuple):
+        return tuple(canonical_key(part) for part in key)
+    raise TypeError(f"Snapshot keys must be str, bytes, numbers or tuples, not {type(key).__name__}")
+
+
+def encode_key(key):
+    """
+    Serialize a key the same way on write and on lookup.
+    :param key: Cache key.
+    :return: Key bytes.
+    :raises TypeError: For keys canonical_key does not accept.
+    """
+    return pickle.dumps(canonical_key(key), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def key_hash(key_bytes):
+    """
+    64-bit hash used to order the index.
+    :param key_bytes: Encoded key.
+    :return: Unsigned 64-bit integer.
+    """
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little")
+
+
+def write_snapshot(path, entries):
+    """
+    Write (key, value, expiry) entries to a snapshot file atomically.
+    Entries with unsupported keys or values that cannot be pickled are skipped.
+    :param path: Destination file.
+    :param entries: Iterable of (key, value, expiry or None).
+    :return: Number of entries written.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    index = []
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, 0, 0, time.time()))
+            for key, value, expiry in entries:
+                try:
+                    key_bytes = encode_key(key)
+                    value_bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    continue
+                index.append((key_hash(key_bytes), f.tell()))
+                f.write(RECORD.pack(expiry or 0.0, len(key_bytes), len(value_bytes)))
+                f.write(key_bytes)
+                f.write(value_bytes)
+            index.sort()
+            index_offset = f.tell()
+            for item in index:
+                f.write(INDEX.pack(*item))
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, len(index), index_offset, time.time()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(index)
+
+
+class SnapshotReader:
+    """Memory-mapped snapshot; opening it reads only the header."""
+
+    def __init__(self, path):
+        """
+        :param path: Snapshot file written by write_snapshot.
+        """
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty snapshot file: {path}")
+        magic, self.count, self.index_offset, self.created_at = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a MemoryCache snapshot: {path}")
+
+    def _record(self, offset):
+        """Decode the record header at offset into (expiry, key start, lengths)."""
+        expiry, key_len, value_len = RECORD.unpack_from(self._mm, offset)
+        start = offset + RECORD.size
+        return expiry or None, start, key_len, value_len
+
+    def lookup(self, key):
+        """
+        Binary-search the index for a key.
+        :param key: Cache key.
+        :return: (value, expiry) if present, else None.
+        """
+        try:
+            key_bytes = encode_key(key)
+        except TypeError:
+            return None  # never written
+        target = key_hash(key_bytes)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if INDEX.unpack_from(self._mm, self.index_offset + mid * INDEX.size)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self.count:
+            h, offset = INDEX.unpack_from(self._mm, self.index_offset + lo * INDEX.size)
+            if h != target:
+                break
+            expiry, start, key_len, value_len = self._record(offset)
+            if self._mm[start:start + key_len] == key_bytes:
+                value_start = start + key_len
+                return pickle.loads(self._mm[value_start:value_start + value_len]), expiry
+            lo += 1
+        return None
+
+    def __iter__(self):
+        """Yield (key, value, expiry) for every record in file order."""
+        offset = HEADER.size
+        while offset < self.index_offset:
+            expiry, start, key_len, value_len = self._record(offset)
+            value_start = start + key_len
+            key = pickle.loads(self._mm[start:value_start])
+            value = pickle.loads(self._mm[value_start:value_start + value_len])
+            yield key, value, expiry
+            offset = value_start + value_len
+
+    def close(self):
+        """Unmap and close the file."""
+        self._mm.close()
+        self._file.close()
@@ -0,0 +1,23 @@
+from os import getenv
+
+from cache.redis_client import RedisClient
+from cache.sharding import HashRing
+
+# Key movement when a fifth node joins a four-node ring
+keys = [f"user:{i}" for i in range(100_000)]
+ring = HashRing(["node-a", "node-b", "node-c", "node-d"])
+before = {key: ring.get_node(key) for key in keys}
+ring.add_node("node-e")
+moved = sum(1 for key in keys if ring.get_node(key) != before[key])
+print(f"moved {moved / len(keys):.1%}")  # Output: about 20% (1/5)
+
+# Hash tags keep related keys on one node
+print(ring.get_node("{user:1}:cart") == ring.get_node("{user:1}:profile"))  # Output: True
+
+# Against real nodes, e.g. REDIS_NODES=localhost:6379,localhost:6380,localhost:6381
+nodes = [node for node in getenv("REDIS_NODES", "").split(",") if node]
+if nodes:
+    client = RedisClient(nodes=nodes)
+    client.set_many({key: {"id": key} for key in keys[:100]})
+    print(len(client.get_many(keys[:100])))  # Output: 100
+    print(client.delete_many(keys[:100]))  # Output: 100
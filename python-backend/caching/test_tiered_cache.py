@@ -0,0 +1,33 @@
+import time
+
+from cache.redis_client import RedisClient
+from cache.tiered_cache import TieredCache
+
+# Two "processes" sharing one Redis: fakeredis if installed, else localhost
+try:
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    redis_a, redis_b = RedisClient(), RedisClient()
+    redis_a.client = fakeredis.FakeStrictRedis(server=server)
+    redis_b.client = fakeredis.FakeStrictRedis(server=server)
+except ImportError:
+    redis_a, redis_b = RedisClient(), RedisClient()
+
+cache_a = TieredCache(l2=redis_a, l1_ttl=30)
+cache_b = TieredCache(l2=redis_b, l1_ttl=30)
+
+cache_a.set("user:1", {"name": "john_doe"})
+print(cache_b.get("user:1"))  # Output: {'name': 'john_doe'} (from Redis, now in B's L1)
+
+cache_a.set("user:1", {"name": "jane_doe"})
+time.sleep(0.5)  # Let the invalidation reach B
+print(cache_b.l1.get("user:1"))  # Output: None (evicted from B's L1)
+print(cache_b.get("user:1"))  # Output: {'name': 'jane_doe'}
+
+cache_a.delete("user:1")
+time.sleep(0.5)
+print(cache_b.get("user:1"))  # Output: None
+
+cache_a.stop()
+cache_b.stop()
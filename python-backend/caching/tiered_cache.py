@@ -0,0 +1,174 @@
+import json
+from uuid import uuid4
+
+from .memory_cache import MemoryCache
+from .redis_client import RedisClient
+
+
+class TieredCache:
+    """
+    Near cache: a per-process MemoryCache (L1) in front of Redis (L2).
+
+    Writes and deletes publish the touched keys on a Redis channel so every
+    other process drops its L1 copy. Pub/sub delivery is best effort, so L1
+    entries also carry a short TTL that bounds how stale they can get.
+    """
+
+    def __init__(self, l2=None, l1=None, channel="cache:invalidate", l1_ttl=5, listen=True):
+        """
+        Args:
+            l2 (RedisClient, optional): Shared Redis tier.
+            l1 (MemoryCache, optional): Per-process tier.
+            channel (str): Pub/sub channel carrying invalidations.
+            l1_ttl (int): Upper bound in seconds on an L1 entry's lifetime.
+            listen (bool): Subscribe to invalidations immediately.
+        """
+        self.l2 = l2 or RedisClient()
+        self.l1 = l1 or MemoryCache(max_entries=10000, name="tiered_l1")
+        self.channel = channel
+        self.l1_ttl = l1_ttl
+        self.node_id = uuid4().hex
+        self._pubsub = None
+        self._listener = None
+        if listen:
+            self.start()
+
+    def start(self):
+        """Subscribe to the invalidation channel in a background thread."""
+        if self._listener is not None:
+            return
+        self._pubsub = self.l2.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: self._on_invalidate})
+        self._listener = self._pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+
+    def stop(self):
+        """Stop listening for invalidations."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def get(self, key):
+        """
+        Retrieve a value, answering from L1 when possible.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            any: Cached value, or None if key doesn't exist.
+        """
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        value = self.l2.get(key)
+        if value is not None:
+            self.l1.set(key, value, self.l1_ttl)
+        return value
+
+    def set(self, key, value, expiry_seconds=None):
+        """
+        Write a value through both tiers and invalidate other processes.
+
+        Args:
+            key (str): Cache key.
+            value (any): Value to store (serialized to JSON in Redis).
+            expiry_seconds (int, optional): Time to live for the key in seconds.
+        """
+        self.l2.set(key, value, expiry_seconds)
+        self.l1.set(key, value, self._local_ttl(expiry_seconds))
+        self._publish([key])
+
+    def delete(self, key):
+        """
+        Delete a key from both tiers and invalidate other processes.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            bool: True if the key existed in Redis, False otherwise.
+        """
+        self.l1.delete(key)
+        deleted = self.l2.delete(key)
+        self._publish([key])
+        return deleted
+
+    def get_many(self, keys):
+        """
+        Retrieve several keys; L1 misses are fetched with one MGET.
+
+        Args:
+            keys (iterable): Cache keys.
+
+        Returns:
+            dict: Values of the keys that exist.
+        """
+        keys = list(keys)
+        found = self.l1.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = self.l2.get_many(missing)
+            self.l1.set_many(fetched, self.l1_ttl)
+            found.update(fetched)
+        return found
+
+    def set_many(self, mapping, expiry_seconds=None):
+        """
+        Write several values through both tiers with one invalidation message.
+
+        Args:
+            mapping (dict): Keys and values to store.
+            expiry_seconds (int or dict, optional): One TTL for every key, or
+                a dict of per-key TTLs in seconds.
+        """
+        if not mapping:
+            return
+        self.l2.set_many(mapping, expiry_seconds)
+        for key, value in mapping.items():
+            if isinstance(expiry_seconds, dict):
+                ttl = expiry_seconds.get(key)
+            else:
+                ttl = expiry_seconds
+            self.l1.set(key, value, self._local_ttl(ttl))
+        self._publish(list(mapping))
+
+    def delete_many(self, keys):
+        """
+        Delete several keys from both tiers with one invalidation message.
+
+        Args:
+            keys (iterable): Cache keys.
+
+        Returns:
+            int: Number of keys deleted from Redis.
+        """
+        keys = list(keys)
+        if not keys:
+            return 0
+        self.l1.delete_many(keys)
+        deleted = self.l2.delete_many(keys)
+        self._publish(keys)
+        return deleted
+
+    def _local_ttl(self, expiry_seconds):
+        """An L1 copy never outlives the L2 entry it mirrors."""
+        if expiry_seconds:
+            return min(expiry_seconds, self.l1_ttl)
+        return self.l1_ttl
+
+    def _publish(self, keys):
+        """Tell the other processes to drop their L1 copies of keys."""
+        message = json.dumps({"origin": self.node_id, "keys": keys})
+        self.l2.client.publish(self.channel, message)
+
+    def _on_invalidate(self, message):
+        """Pub/sub handler evicting keys written by another process."""
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        if payload.get("origin") != self.node_id:
+            self.l1.delete_many(payload.get("keys", []))
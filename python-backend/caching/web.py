@@ -1,12 +1,94 @@
 #!/usr/bin/env python3
 """ expiring web cache module """
 
-import redis
+import time
 import requests
-from typing import Callable
+from typing import Callable, Optional
 from functools import wraps
+from threading import Event, Lock, Thread
+from uuid import uuid4
+from .connection import get_redis
+from .instrumentation import get_metrics
 
-redis = redis.Redis()
+metrics = get_metrics("web")
+
+CACHE_TTL = 10  # seconds a page is served as fresh
+STALE_TTL = 30  # extra seconds a stale page is served while one worker refreshes
+LEASE_TTL = 5  # seconds one worker may hold the recompute lease
+LEASE_POLL = 0.05  # seconds between checks while waiting on another worker
+LEASE_WAIT = 30  # seconds a cold miss waits on another worker before giving up
+
+# Lease scripts only touch the lease while it still holds the caller's token
+RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+EXTEND_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end
+return 0
+"""
+
+# Striped in-process locks: one recompute per URL per process, bounded memory
+_local_locks = [Lock() for _ in range(64)]
+
+
+def _acquire_lease(url: str) -> Optional[str]:
+    """ Take the cluster-wide recompute lease for a URL; returns its token """
+    token = uuid4().hex
+    return token if get_redis().set(f"lease:{url}", token, nx=True, ex=LEASE_TTL) else None
+
+
+def _release_lease(url: str, token: str) -> None:
+    """ Drop the lease unless it has already passed to another worker """
+    get_redis().eval(RELEASE_LEASE, 1, f"lease:{url}", token)
+
+
+def _keep_lease(url: str, token: str, done: Event) -> None:
+    """ Extend the lease while a slow recompute runs; stop once it is lost """
+    while not done.wait(LEASE_TTL / 2):
+        try:
+            if not get_redis().eval(EXTEND_LEASE, 1, f"lease:{url}", token, LEASE_TTL):
+                return
+        except Exception:
+            return  # the lease lapses and another worker can take over
+
+
+def _refresh(fn: Callable, url: str, token: str) -> str:
+    """ Recompute a page under the lease, store it and release the lease """
+    done = Event()
+    Thread(target=_keep_lease, args=(url, token, done), daemon=True).start()
+    try:
+        result = fn(url)
+        metrics.observe_size(len(result))
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.setex(f"cached:{url}", CACHE_TTL + STALE_TTL, result)
+        pipe.setex(f"fresh:{url}", CACHE_TTL, 1)
+        pipe.eval(RELEASE_LEASE, 1, f"lease:{url}", token)
+        pipe.execute()
+        return result
+    except Exception:
+        _release_lease(url, token)
+        raise
+    finally:
+        done.set()
+
+
+def _refresh_in_background(fn: Callable, url: str, token: str) -> None:
+    """ Refresh a stale page without blocking the caller """
+    def run():
+        try:
+            _refresh(fn, url, token)
+        except Exception:
+            # The stale copy keeps being served until it ages out
+            pass
+
+    Thread(target=run, daemon=True).start()
+
+
+def _cached(url: str) -> Optional[str]:
+    """ Read a cached page, fresh or stale """
+    cached_response = get_redis().get(f"cached:{url}")
+    return cached_response.decode('utf-8') if cached_response else None
 
 
 def wrap_requests(fn: Callable) -> Callable:
@@ -15,17 +97,48 @@ def wrap_requests(fn: Callable) -> Callable:
     @wraps(fn)
     def wrapper(url):
         """ Wrapper for decorator guy """
-        redis.incr(f"count:{url}")
-        cached_response = redis.get(f"cached:{url}")
-        if cached_response:
-            return cached_response.decode('utf-8')
-        result = fn(url)
-        redis.setex(f"cached:{url}", 10, result)
-        return result
+        with metrics.timer("get_page"):
+            return _lookup(fn, url)
 
     return wrapper
 
 
+def _lookup(fn: Callable, url: str) -> str:
+    """ Serve a page from the cache, recomputing it at most once """
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.incr(f"count:{url}")
+    pipe.get(f"cached:{url}")
+    pipe.exists(f"fresh:{url}")
+    _, cached_response, fresh = pipe.execute()
+    if cached_response:
+        metrics.hit()
+        if not fresh:
+            token = _acquire_lease(url)
+            if token:
+                _refresh_in_background(fn, url, token)
+        return cached_response.decode('utf-8')
+
+    metrics.miss()
+    # Cold miss: single-flight within the process, then across processes
+    with _local_locks[hash(url) % len(_local_locks)]:
+        cached = _cached(url)
+        if cached is not None:
+            return cached
+        # The holder keeps its lease alive; if it dies the lease expires
+        # and one waiter takes it over. Nobody recomputes without it.
+        deadline = time.monotonic() + LEASE_WAIT
+        token = _acquire_lease(url)
+        while token is None:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for another worker to fetch {url}")
+            time.sleep(LEASE_POLL)
+            cached = _cached(url)
+            if cached is not None:
+                return cached
+            token = _acquire_lease(url)
+        return _refresh(fn, url, token)
+
+
 @wrap_requests
 def get_page(url: str) -> str:
     """get page self descriptive
@@ -101,10 +101,22 @@ class DBStorage:
         if obj:
             self.__session.add(obj)
 
+    def new_many(self, objs):
+        """Add several objects to the current database session at once."""
+        self.__session.add_all([obj for obj in objs if obj])
+
     def save(self):
         """Commit all changes of the current database session."""
         self.__session.commit()
 
+    def rollback(self, objs=None):
+        """
+        Discard uncommitted changes, e.g. after a failed commit. objs is
+        accepted for StorageManager compatibility; the session already
+        tracks every pending object.
+        """
+        self.__session.rollback()
+
     def delete(self, obj=None):
         """Delete an object from the current database session if not None."""
         if obj:
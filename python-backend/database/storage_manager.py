@@ -19,12 +19,26 @@ class StorageManager:
     def new(self, obj):
         self.storage.new(obj)
 
+    def new_many(self, objs):
+        if hasattr(self.storage, "new_many"):
+            self.storage.new_many(objs)
+        else:
+            for obj in objs:
+                self.storage.new(obj)
+
     def save(self):
         self.storage.save()
 
     def delete(self, obj):
         self.storage.delete(obj)
 
+    def rollback(self, objs=()):
+        if hasattr(self.storage, "rollback"):
+            self.storage.rollback()
+        else:
+            for obj in objs:
+                self.storage.delete(obj)
+
     def get(self, cls, id):
         return self.storage.get(cls, id)
 